@@ -1,8 +1,104 @@
+import json
+import math
 import polars as pl
 from polars import col
-import mplfinance as mpf
 from pathlib import Path
 
+from info import PERIOD_SHORT, PERIOD_LONG, PERIOD_SUPPORT, LEVELS_MAX, LEVELS_ATR_MULTIPLE
+
+
+# Expressions des indicateurs, partagées par l'analyse d'une crypto et l'analyse groupée de plusieurs cryptos :
+# avec over="symbol", chaque expression est évaluée séparément pour chaque crypto d'un DataFrame au format long.
+
+def _per_symbol(expr: pl.Expr, name: str, over: str | None) -> pl.Expr:
+    return (expr.over(over) if over else expr).alias(name)
+
+
+def moving_average_exprs(short_window: int, long_window: int, over: str | None = None) -> list[pl.Expr]:
+    """ Moyennes mobiles courte et longue des clôtures. """
+    return [
+        _per_symbol(col("Close").rolling_mean(window_size=short_window, min_periods=1), "MA_short", over),
+        _per_symbol(col("Close").rolling_mean(window_size=long_window, min_periods=1), "MA_long", over),
+    ]
+
+
+def pivot_exprs(window_size: int, over: str | None = None) -> list[pl.Expr]:
+    """ Pivots bruts : 'Low' (support) ou 'High' (résistance) extrêmes sur la fenêtre centrée, null ailleurs. """
+
+    # Condition pour être un support : le 'Low' est le minimum de la fenêtre centrée de 2 * window_size + 1 périodes,
+    # c'est-à-dire plus bas ou égal aux 'window_size' 'Low' précédents ET aux 'window_size' suivants.
+    # Min/max glissants en O(n) quelle que soit la fenêtre ; en bord de série la fenêtre est incomplète (null) :
+    # aucun niveau détecté, comme avec les comparaisons décalées.
+    span = 2 * window_size + 1
+    is_support = col("Low") == col("Low").rolling_min(window_size=span, center=True)
+
+    # Condition pour être une résistance : le 'High' est le maximum de la même fenêtre centrée.
+    is_resistance = col("High") == col("High").rolling_max(window_size=span, center=True)
+
+    return [
+        _per_symbol(pl.when(is_support).then(col("Low")).otherwise(None), "Support", over),
+        _per_symbol(pl.when(is_resistance).then(col("High")).otherwise(None), "Resistance", over),
+    ]
+
+
+def pivot_fill_exprs(over: str | None = None) -> list[pl.Expr]:
+    """ Propagation du dernier support / de la dernière résistance aux bougies suivantes. """
+    return [
+        _per_symbol(col("Support").forward_fill(), "Support", over),
+        _per_symbol(col("Resistance").forward_fill(), "Resistance", over),
+    ]
+
+
+def oscillator_exprs(over: str | None = None) -> list[pl.Expr]:
+    """ MACD (ligne, signal, histogramme) et RSI 14. """
+
+    # Calcul du MACD
+    fast_period, slow_period, signal_period = 12, 26, 9
+    ema_fast = col("Close").ewm_mean(span=fast_period, adjust=False)
+    ema_slow = col("Close").ewm_mean(span=slow_period, adjust=False)
+    macd_line = ema_fast - ema_slow
+    signal_line = macd_line.ewm_mean(span=signal_period, adjust=False)
+    histogram = macd_line - signal_line
+
+    # Calcul du RSI
+    rsi_length = 14
+    price_diff = col("Close").diff(1)
+    gains = pl.when(price_diff > 0).then(price_diff).otherwise(0)
+    losses = pl.when(price_diff < 0).then(-price_diff).otherwise(0)
+    avg_gain = gains.ewm_mean(alpha=1/rsi_length, adjust=False)
+    avg_loss = losses.ewm_mean(alpha=1/rsi_length, adjust=False)
+    relative_strength = (avg_gain / avg_loss).fill_null(0)
+    rsi = 100 - (100 / (1 + relative_strength))
+
+    return [
+        _per_symbol(macd_line, "MACD_line", over), _per_symbol(signal_line, "MACD_signal", over),
+        _per_symbol(histogram, "MACD_hist", over), _per_symbol(rsi, "RSI_14", over),
+    ]
+
+
+# Colonnes lues par le dashboard (build_chart_payload) et par les images des rapports (generate_chart_image)
+CHART_COLUMNS = [
+    "Open Time", "Open", "High", "Low", "Close", "Volume", "MA_short", "MA_long",
+    "Support", "Resistance", "MACD_line", "MACD_signal", "MACD_hist", "RSI_14",
+]
+
+
+def analysis_plan(df: pl.DataFrame | pl.LazyFrame, columns: list[str] | None = None, over: str | None = None,
+                  short_window: int = PERIOD_SHORT, long_window: int = PERIOD_LONG, window_size: int = PERIOD_SUPPORT) -> pl.LazyFrame:
+    """ Chaîne d'analyse paresseuse : seuls les indicateurs nécessaires aux colonnes demandées sont ajoutés au plan,
+        et Polars élague le reste (projection pushdown) avant de tout calculer en un seul collect().
+        columns=None : toutes les colonnes d'entrée et tous les indicateurs.
+    """
+    wanted = set(columns) if columns is not None else set(CHART_COLUMNS)
+    lf = df.lazy()
+    if wanted & {"MA_short", "MA_long"}:
+        lf = lf.with_columns(*moving_average_exprs(short_window, long_window, over))
+    if wanted & {"Support", "Resistance"}:
+        lf = lf.with_columns(*pivot_exprs(window_size, over)).with_columns(*pivot_fill_exprs(over))
+    if wanted & {"MACD_line", "MACD_signal", "MACD_hist", "RSI_14"}:
+        lf = lf.with_columns(*oscillator_exprs(over))
+    return lf.select(columns) if columns is not None else lf
+
 
 class TechnicalChartBuilder:
     """ Classe dédiée à la construction d'analyses techniques modulaires. """
@@ -33,11 +129,7 @@ class TechnicalChartBuilder:
         if df is None or df.is_empty():
             return df
             
-        df = df.with_columns(
-            pl.col("Close").rolling_mean(window_size=short_window, min_periods=1).alias("MA_short"),
-            pl.col("Close").rolling_mean(window_size=long_window, min_periods=1).alias("MA_long")
-        )
-        return df
+        return df.with_columns(*moving_average_exprs(short_window, long_window))
       
         
     def add_pivot_levels(self, df: pl.DataFrame, window_size: int = 10) -> pl.DataFrame:
@@ -46,29 +138,47 @@ class TechnicalChartBuilder:
         if df is None or df.is_empty():
             return df
 
-        # Condition pour être un support : le 'Low' est plus bas ou égal à tous
-        # les 'Low' des 'window_size' périodes précédentes ET des 'window_size' périodes suivantes.
-        is_support = pl.all_horizontal(
-            # Crée une liste de conditions [Low <= Low-10, Low <= Low-9, ..., Low <= Low+9, Low <= Low+10]
-            [pl.col("Low") <= pl.col("Low").shift(i) for i in range(-window_size, window_size + 1) if i != 0]
-        )
-        
-        # Condition pour être une résistance : le 'High' est plus haut ou égal à tous
-        # les 'High' des 'window_size' périodes précédentes ET des 'window_size' périodes suivantes.
-        is_resistance = pl.all_horizontal(
-            [pl.col("High") >= pl.col("High").shift(i) for i in range(-window_size, window_size + 1) if i != 0]
-        )
-
-        df =  df.with_columns(
-            Support=pl.when(is_support).then(col("Low")).otherwise(None),
-            Resistance=pl.when(is_resistance).then(col("High")).otherwise(None)
-        )
+        df = df.with_columns(*pivot_exprs(window_size))
         
         # On peut vouloir ne garder que les niveaux les plus pertinents pour éviter de surcharger le graph
-        return df.with_columns(
-            Support=col("Support").forward_fill(),
-            Resistance=col("Resistance").forward_fill()
+        return df.with_columns(*pivot_fill_exprs())
+        
+        
+    def consolidate_levels(self, df: pl.DataFrame, column: str, max_levels: int = LEVELS_MAX,
+                           tolerance: float | None = None, atr_multiple: float = LEVELS_ATR_MULTIPLE) -> list[float]:
+        """ Regroupe les niveaux de pivot proches ('Support' ou 'Resistance') et retourne au plus max_levels niveaux,
+            classés par nombre de touches puis par date du dernier pivot.
+            Deux niveaux sont regroupés s'ils sont à moins de 'tolerance' (en USDC), ou à défaut de atr_multiple * ATR 14.
+        """
+
+        if df is None or df.is_empty() or column not in df.columns:
+            return []
+
+        # Un pivot = une nouvelle valeur dans la colonne (qui est propagée par forward_fill)
+        pivots = df.with_row_index("index").filter(
+            col(column).is_not_null() & col(column).ne_missing(col(column).shift(1))
+        ).select("index", col(column).alias("level"))
+        if pivots.is_empty():
+            return []
+
+        if tolerance is None:
+            # ATR de Wilder sur 14 périodes, à la dernière bougie
+            previous_close = col("Close").shift(1)
+            true_range = pl.max_horizontal(
+                col("High") - col("Low"), (col("High") - previous_close).abs(), (col("Low") - previous_close).abs()
+            )
+            atr = df.select(true_range.ewm_mean(alpha=1/14, adjust=False)).item(-1, 0)
+            tolerance = atr_multiple * (atr or 0)
+
+        # Niveaux triés par prix : un nouveau groupe commence à chaque écart supérieur à la tolérance
+        clusters = pivots.sort("level").with_columns(
+            cluster=(col("level").diff().fill_null(0) > tolerance).cum_sum()
+        ).group_by("cluster").agg(
+            col("level").mean(),
+            col("index").len().alias("touches"),
+            col("index").max().alias("last_seen"),
         )
+        return clusters.sort(["touches", "last_seen"], descending=True).head(max_levels).get_column("level").to_list()
         
         
     def add_oscillators(self, df: pl.DataFrame) -> pl.DataFrame:
@@ -76,89 +186,103 @@ class TechnicalChartBuilder:
         if df is None or df.is_empty():
             return df
 
-        # Calcul du MACD
-        fast_period, slow_period, signal_period = 12, 26, 9
-        ema_fast = col("Close").ewm_mean(span=fast_period, adjust=False)
-        ema_slow = col("Close").ewm_mean(span=slow_period, adjust=False)
-        macd_line = (ema_fast - ema_slow).alias("MACD_line")
-        signal_line = macd_line.ewm_mean(span=signal_period, adjust=False).alias("MACD_signal")
-        histogram = (macd_line - signal_line).alias("MACD_hist")
-
-        # Calcul du RSI
-        rsi_length = 14
-        price_diff = col("Close").diff(1)
-        gains = pl.when(price_diff > 0).then(price_diff).otherwise(0)
-        losses = pl.when(price_diff < 0).then(-price_diff).otherwise(0)
-        avg_gain = gains.ewm_mean(alpha=1/rsi_length, adjust=False)
-        avg_loss = losses.ewm_mean(alpha=1/rsi_length, adjust=False)
-        relative_strength = (avg_gain / avg_loss).fill_null(0)
-        rsi = (100 - (100 / (1 + relative_strength))).alias("RSI_14")
-
-        return df.with_columns(macd_line, signal_line, histogram, rsi)
+        return df.with_columns(*oscillator_exprs())
     
 
-    def generate_chart_image(self, df_analyzed: pl.DataFrame, symbol: str, file_path: str) -> Path | None:
-        """ Génère une image compacte du graphique avec les indicateurs techniques. """
+    def analyze(self, df: pl.DataFrame, columns: list[str] | None = CHART_COLUMNS, last_only: bool = False,
+                short_window: int = PERIOD_SHORT, long_window: int = PERIOD_LONG, window_size: int = PERIOD_SUPPORT) -> pl.DataFrame:
+        """ Analyse technique complète d'une crypto en un seul plan Polars, limitée aux colonnes demandées.
+            last_only : seule la dernière bougie est retournée (filtrage, écran de surveillance...).
+        """
+        if df is None or df.is_empty():
+            return df
+
+        lf = analysis_plan(df, columns, None, short_window, long_window, window_size)
+        return (lf.last() if last_only else lf).collect()
+
+
+    def analyze_symbols(self, df: pl.DataFrame | pl.LazyFrame, short_window: int = PERIOD_SHORT,
+                        long_window: int = PERIOD_LONG, window_size: int = PERIOD_SUPPORT) -> pl.LazyFrame:
+        """ Analyse technique de plusieurs cryptos en une seule requête Polars paresseuse.
+            df est au format long : une colonne 'symbol' en plus des colonnes de cotations, une ligne par (symbol, bougie).
+        """
+        return analysis_plan(df.lazy().sort("symbol", "Open Time"), None, "symbol", short_window, long_window, window_size)
+
+
+    def summarize_symbols(self, df: pl.DataFrame | pl.LazyFrame, short_window: int = PERIOD_SHORT,
+                          long_window: int = PERIOD_LONG, window_size: int = PERIOD_SUPPORT) -> pl.DataFrame:
+        """ Statistiques de add_summary_stats pour chaque crypto d'un DataFrame au format long, une ligne par crypto. """
+        diff = col("close") - col("open")
+        return (
+            self.analyze_symbols(df, short_window, long_window, window_size)
+            .group_by("symbol", maintain_order=True)
+            .agg(open=col("Open").first(), close=col("Close").last(), rsi=col("RSI_14").last())
+            .with_columns(
+                diff=diff,
+                percent=pl.when(col("open") != 0).then(diff / col("open") * 100).otherwise(0),
+            )
+            .select("symbol", col("open", "close", "diff", "percent", "rsi").round(2))
+            .collect()
+        )
+
+
+    def build_chart_payload(self, df_analyzed: pl.DataFrame, summary_stats: dict) -> bytes:
+        """ Sérialise directement les colonnes Polars en JSON colonnaire pour le dashboard, sans passer par des listes Python. """
+
+        # Une seule ligne de listes : Polars écrit le JSON lui-même (NaN -> null), en un objet JSON par ligne
+        columns = df_analyzed.select(
+            col("Open Time").dt.strftime('%Y-%m-%dT%H:%M:%S').implode().alias("x"),
+            col("Open").implode().alias("open"),
+            col("High").implode().alias("high"),
+            col("Low").implode().alias("low"),
+            col("Close").implode().alias("close"),
+            col("Volume").implode().alias("volume"),
+            col("MA_short").implode().alias("ma_short"),
+            col("MA_long").implode().alias("ma_long"),
+            col("RSI_14").implode().alias("rsi"),
+            col("MACD_line").implode().alias("macd"),
+            col("MACD_signal").implode().alias("macd_signal"),
+            col("MACD_hist").implode().alias("macd_hist"),
+        ).write_ndjson()
+        # NaN / inf (RSI sur prix plats...) -> null, comme dans les colonnes : le JSON reste valide côté navigateur
+        finite = lambda v: None if isinstance(v, float) and not math.isfinite(v) else v
+        extra = {
+            "supports": [finite(v) for v in self.consolidate_levels(df_analyzed, "Support")],
+            "resistances": [finite(v) for v in self.consolidate_levels(df_analyzed, "Resistance")],
+            "summary_stats": {k: finite(v) for k, v in summary_stats.items()},
+        }
+
+        # NDJSON d'une ligne : exactement '{...}\n'. On rouvre l'objet pour y ajouter les niveaux consolidés et les
+        # statistiques, sérialisés à part ('{"supports":...}' sans son accolade ouvrante)
+        body = columns.rstrip("\n")
+        if not (body.startswith("{") and body.endswith("}")):
+            raise ValueError(f"Sortie NDJSON inattendue : {body[:40]!r}")
+        return f'{body[:-1]},{json.dumps(extra, allow_nan=False)[1:]}'.encode()
+        
+
+    def generate_chart_image(self, df_analyzed: pl.DataFrame, symbol: str, file_path: str | None = None) -> bytes | Path | None:
+        """ Génère une image compacte du graphique avec les indicateurs techniques.
+            Retourne le PNG en mémoire (bytes), ou l'écrit dans file_path et retourne son chemin si fourni.
+        """
         
         if df_analyzed is None or df_analyzed.is_empty():
             return None
             
-        # 1. Calculs et préparation des données, pandas nécessaire pour mplfinance
-        df_pandas = df_analyzed.to_pandas().set_index('Open Time')
-        
-        supports = df_pandas['Support'].dropna().unique().tolist()
-        resistances = df_pandas['Resistance'].dropna().unique().tolist()
-        hlines = dict(hlines=supports + resistances, 
-                      colors=['g'] * len(supports) + ['r'] * len(resistances), 
-                      linestyle='--')
-
-        # Préparation des tracés additionnels
-        additional_plots = []
-        
-        # Moyennes Mobiles (panel 0)
-        if 'MA_short' in df_pandas.columns and not df_pandas['MA_short'].isnull().all():
-            additional_plots.append(mpf.make_addplot(df_pandas['MA_short'], color='orange'))
-        if 'MA_long' in df_pandas.columns and not df_pandas['MA_long'].isnull().all():
-            additional_plots.append(mpf.make_addplot(df_pandas['MA_long'], color='purple'))
-        
-        # Volume (panel 0, axe Y secondaire)
-        if 'Volume' in df_pandas.columns:
-            additional_plots.append(mpf.make_addplot(df_pandas['Volume'], type='bar', panel=0, color='gray', alpha=0.3, secondary_y=True))
-
-        next_panel = 1
-
-        # RSI (panel 1)
-        if 'RSI_14' in df_pandas.columns and not df_pandas['RSI_14'].isnull().all():
-            additional_plots.append(mpf.make_addplot(df_pandas['RSI_14'], panel=next_panel, color='blue', ylabel='RSI'))
-            next_panel += 1
-
-        # MACD (panel 2)
-        if 'MACD_line' in df_pandas.columns and not df_pandas['MACD_line'].isnull().all():
-            macd_plots = [
-                mpf.make_addplot(df_pandas['MACD_line'], panel=next_panel, color='navy', ylabel='MACD'),
-                mpf.make_addplot(df_pandas['MACD_signal'], panel=next_panel, color='cyan'),
-                mpf.make_addplot(df_pandas['MACD_hist'], type='bar', panel=next_panel, color='gray', alpha=0.5)
-            ]
-            additional_plots.extend(macd_plots)
-            next_panel += 1
-
-        # 3. Génération du graphique
+        supports = self.consolidate_levels(df_analyzed, 'Support')
+        resistances = self.consolidate_levels(df_analyzed, 'Resistance')
+
+        # Génération du graphique : figure pré-construite réutilisée, rendu en mémoire
+        # (matplotlib n'est chargé qu'au premier rendu, dans le processus qui l'exécute)
+        from charts import get_renderer
+
         try:
+            png = get_renderer().render(df_analyzed, symbol, supports, resistances)
+            if file_path is None:
+                return png
+
             image_path = Path(file_path)
             image_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            panel_ratios_list = (6, 2, 2)
-            
-            mpf.plot(
-                df_pandas,
-                type='candle', style='yahoo', title=f'\nAnalyse Technique {symbol}',
-                ylabel='Cours (USDC)',
-                volume=False,
-                addplot=additional_plots if additional_plots else None,
-                panel_ratios=panel_ratios_list,
-                hlines=hlines, figratio=(12, 8), figscale=1.2,
-                savefig=str(image_path)
-            )
+            image_path.write_bytes(png)
             
             #print(f"Image compacte générée avec succès via Matplotlib : {image_path}")
             return image_path
@@ -167,4 +291,4 @@ class TechnicalChartBuilder:
             print(f"Erreur lors de la génération de l'image avec Matplotlib : {e}")
             import traceback
             traceback.print_exc()
-            return None
\ No newline at end of file
+            return None
@@ -1,39 +1,53 @@
+import gzip
 import os
-import schedule
 import time
 import threading
-import psutil
-import plotly.graph_objects as go
-import json
+import polars as pl
 
 
-from flask import Flask, render_template, request, redirect, url_for, jsonify, flash
-from binance.client import Client
-from plotly.subplots import make_subplots
+from flask import Flask, Response, render_template, request, redirect, url_for, jsonify, flash
 
-from pathlib import Path
+from concurrent.futures import Future, wait
 from datetime import datetime, timedelta
 
 from cotations import BinanceAPI
-from scheduler import JobStore
+from backfill import BulkKlineFetcher
+from store import KlineStore
+from scheduler import FREQUENCIES, JobStore, TaskScheduler
 from emailer import SimpleEmailer
-from analysis import TechnicalChartBuilder
-from info import CRYPTOS, PERIOD_SHORT, PERIOD_LONG, PERIOD_SUPPORT, TIME_SCHEDULER
+from analysis import TechnicalChartBuilder, CHART_COLUMNS
+from workers import ReportPool, when_all
+from live import BinanceKlineFeed, LiveMarket
+from cache import ResponseCache, SharedCache, candle_open_time, compress_payload, payload_etag
+from monitor import SystemSampler
+from warmer import SnapshotWarmer
+from info import CRYPTOS, PROFONDEURS, EMAIL_MAX_PER_MINUTE, BASE_INTERVAL, SCHEDULER_LOCK_PATH, SCHEDULER_SYNC_INTERVAL, LIVE_MAX_CLIENTS
 
     
 class SiteWebLocal:
     """Classe principale pour l'application web locale de suivi des cryptomonnaies."""
     
-    def __init__(self):
+    def __init__(self, shared_cache=False):
+        """shared_cache : réponses mises en cache aussi dans une base SQLite commune (mode multi-processus, voir wsgi.py)."""
         # Initialisation de Flask et de sa configuration
         self.app = Flask(__name__, template_folder='templates', static_folder='static')
         self.app.secret_key = "une_cle_secrete_pour_les_messages_flash"
         
         # Initialisation des outils
-        self.binance_api = BinanceAPI()
+        self.binance_api = BinanceAPI(store=KlineStore(), base_interval=BASE_INTERVAL, bulk_fetcher=BulkKlineFetcher())
         self.db = JobStore()
+        self.scheduler = TaskScheduler()
         self.cryptos = CRYPTOS
         self.chart_builder = TechnicalChartBuilder()
+        self.response_cache = ResponseCache(shared=SharedCache() if shared_cache else None)
+        self.report_pool = ReportPool()
+        self.live_market = LiveMarket(BinanceKlineFeed(), self.binance_api, self.chart_builder)
+        self.stream_slots = threading.BoundedSemaphore(LIVE_MAX_CLIENTS)
+        self.system_sampler = SystemSampler()
+        # Vues du dashboard précalculées à chaque clôture de bougie : (symbol, profondeur) -> intervalle
+        self.snapshot_warmer = SnapshotWarmer(self.historique_snapshot, {
+            (symbol, profondeur): interval for symbol in self.cryptos for profondeur, (_, interval) in PROFONDEURS.items()
+        })
 
         
         # Configuration des routes
@@ -45,9 +59,10 @@ class SiteWebLocal:
         self.app.route('/dashboard')(self.dashboard_page)
         self.app.route('/monitoring')(self.monitoring_page)
         self.app.route('/scheduling', methods=['GET', 'POST'])(self.scheduling_page)
-        self.app.route('/delete-schedule/<int:schedule_id>', methods=['POST'])(self.delete_schedule)
+        self.app.route('/delete-schedule/<job_id>', methods=['POST'])(self.delete_schedule)
         self.app.route('/a-propos')(self.a_propos_page)
         self.app.route('/api/historique')(self.api_historique)
+        self.app.route('/api/stream')(self.api_stream)
         self.app.route('/api/system-stats')(self.get_system_stats)
 
 
@@ -71,135 +86,249 @@ class SiteWebLocal:
         """Page de planification des envois d'emails."""
         if request.method == 'POST':
             symbol, email, frequency = request.form['symbol'], request.form['recipient_email'], request.form['frequency']
-            # On stocke en BDD.
+            if symbol not in self.cryptos or frequency not in FREQUENCIES:
+                flash("Crypto ou fréquence d'envoi invalide.", "danger")
+                return redirect(url_for('scheduling_page'))
+            # On stocke en BDD puis on programme la tâche dans le scheduler en cours, sans redémarrage
             job_id = f"job_{os.urandom(8).hex()}"
-            self.db.add_schedule(symbol, email, frequency, job_id)
-            flash(f"Envoi programmé pour {symbol} vers {email} ({frequency}). Le serveur doit redémarrer pour appliquer le nouveau planning.", "success")
+            next_run = self.db.add_schedule(symbol, email, frequency, job_id)
+            if next_run:
+                self.scheduler.schedule(job_id, next_run, self.run_due_reports)
+                flash(f"Envoi programmé pour {symbol} vers {email} ({frequency}). Premier envoi le {next_run:%d/%m/%Y à %H:%M}.", "success")
+            else:
+                flash("Erreur lors de l'enregistrement de l'envoi.", "danger")
             return redirect(url_for('scheduling_page'))
         
         schedules = self.db.get_all_schedules()
         return render_template('scheduling.html', titre="Planification d'envois", schedules=schedules, cryptos=self.cryptos)
 
 
-    def delete_schedule(self, schedule_id):
-        """Supprime une tâche planifiée par son ID."""
-        self.db.remove_schedule_by_id(schedule_id)
-        flash("Tâche supprimée de la base. Redémarrez le serveur pour arrêter les envois.", "info")
+    def delete_schedule(self, job_id):
+        """Supprime une tâche planifiée par son identifiant job_id (effet immédiat sur le scheduler)."""
+        self.scheduler.cancel(job_id)
+        if self.db.remove_schedule(job_id):
+            flash("Tâche supprimée : elle ne fera plus partie des prochains envois.", "info")
+        else:
+            flash("Tâche introuvable (déjà supprimée ?).", "danger")
         return redirect(url_for('scheduling_page'))
 
 
-    def built_report(self, symbol: str, start_date_str: str, interval: str) -> tuple[Path | None, dict]:
-        """Génère un rapport pour une crypto donnée et retourne le chemin de l'image générée ainsi que les stats."""
-        
-        df_raw = self.binance_api.get_historical_data(symbol, interval, start_date_str)
-        
-        # Analyse technique
-        df_ma = self.chart_builder.add_moving_averages(df_raw, PERIOD_SHORT, PERIOD_LONG)
-        df_pivots = self.chart_builder.add_pivot_levels(df_ma, PERIOD_SUPPORT)
-        df_analyzed = self.chart_builder.add_oscillators(df_pivots)
-        stats = self.chart_builder.add_summary_stats(df_analyzed)
+    def built_report(self, symbol: str, start_date_str: str, interval: str) -> tuple[bytes | None, dict]:
+        """Génère un rapport pour une crypto donnée et retourne l'image PNG (en mémoire) ainsi que les stats.
+           Le téléchargement et le rendu passent par leurs étapes respectives du pool de rapports.
+        """
+        df_analyzed, stats = self.report_pool.run('fetch', f"analyse {symbol} {interval}", self.analyze_report, symbol, start_date_str, interval)
         
-        # Génération de l'image
-        path = Path(f"temp/temp_chart_{symbol}_{os.urandom(4).hex()}.png")
-        generated_path = self.chart_builder.generate_chart_image(df_analyzed, symbol, path)
+        # Génération de l'image en mémoire (dans un processus de rendu), sans fichier temporaire
+        png = self.report_pool.run('render', f"graphique {symbol} {interval}", self.chart_builder.generate_chart_image, df_analyzed, symbol)
         
-        if generated_path:
-            #print(f"Graphique généré avec succès : {generated_path}")
-            return generated_path, stats
+        if png:
+            return png, stats
         else:
             print("Erreur lors de la génération du graphique.")
             return None, None
+
+
+    def analyze_report(self, symbol: str, start_date_str: str, interval: str) -> tuple[pl.DataFrame | None, dict]:
+        """Télécharge les cotations et effectue l'analyse technique d'un rapport."""
+        
+        df_raw = self.binance_api.get_historical_data(symbol, interval, start_date_str)
+        
+        # Analyse technique : un seul plan Polars, limité aux colonnes du graphique
+        df_analyzed = self.chart_builder.analyze(df_raw, CHART_COLUMNS)
+        stats = self.chart_builder.add_summary_stats(df_analyzed)
+        return df_analyzed, stats
     
      
     def send_report_email(self, symbol, recipient_email) -> None:
-        """Génère les graphiques sur 30j et 7 jours, et envoie l'email."""  
-  
-        print(f"TÂCHE EXÉCUTÉE : Génération du rapport pour {symbol} à destination de {recipient_email}...")
-
-        # génération des graphiques sur 30j
-        generated_path_30d, stats_30d = self.built_report(
-            symbol=symbol,
-            start_date_str='30 days ago UTC',
-            interval=Client.KLINE_INTERVAL_4HOUR
-        )
-        
-        # génération des graphiques sur 7j
-        generated_path_7d, stats_7d = self.built_report(
-            symbol=symbol,
-            start_date_str='7 days ago UTC',
-            interval=Client.KLINE_INTERVAL_1HOUR
-        )
+        """Génère les graphiques sur 30j et 7 jours, et envoie l'email."""
+        # Lot vide (identifiants manquants) ou remplacé par une fonction sans résultat : rien à attendre
+        wait(self.send_report_batch({symbol: [recipient_email]}) or [])
+
+
+    def build_symbol_report(self, symbol) -> list[tuple[bytes, dict]] | None:
+        """Génère une seule fois les graphiques et stats 30j / 7j d'une crypto, partagés par tous ses destinataires."""
+
+        reports = [
+            # génération des graphiques sur 30j
+            self.built_report(symbol=symbol, start_date_str='30 days ago UTC', interval='4h'),
+            # génération des graphiques sur 7j
+            self.built_report(symbol=symbol, start_date_str='7 days ago UTC', interval='1h'),
+        ]
 
         # Vérification que les deux images ont bien été créées
-        if not (generated_path_30d and generated_path_7d):
-            print("Erreur: Au moins un des deux graphiques n'a pas pu être généré.")
-            # Nettoyage au cas où un seul des deux aurait été créé
-            if generated_path_30d and generated_path_30d.exists(): generated_path_30d.unlink()
-            if generated_path_7d and generated_path_7d.exists(): generated_path_7d.unlink()
-            return
+        if not all(png for png, _ in reports):
+            print(f"Erreur: Au moins un des deux graphiques {symbol} n'a pas pu être généré.")
+            return None
+        return reports
 
-        # --- Construction de l'e-mail enrichi ---
+
+    def send_report_batch(self, recipients: dict[str, list[str]]) -> list[Future]:
+        """Envoie un lot de rapports : chaque crypto est téléchargée, analysée et tracée une seule fois puis envoyée à tous ses destinataires.
+           Les cryptos sont traitées en parallèle par le pool de rapports, la méthode retourne sans attendre.
+        """
+
+        # --- Identifiants d'envoi ---
         sender_email = os.environ.get('GMAIL_USER')
         sender_pass = os.environ.get('GMAIL_APP_PASS')
 
         if not sender_email or not sender_pass:
             print("Erreur: GMAIL_USER ou GMAIL_APP_PASS n'est pas configuré.")
+            return []
+
+        # Une seule connexion SMTP authentifiée pour tout le lot, fermée quand tous les rapports sont partis
+        emailer = SimpleEmailer(user=sender_email, password=sender_pass, max_per_minute=EMAIL_MAX_PER_MINUTE).open()
+        futures = [
+            self.report_pool.submit('batch', f"rapport {symbol}", self.send_symbol_reports, symbol, emails, emailer)
+            for symbol, emails in recipients.items()
+        ]
+        when_all(futures, emailer.close)
+        return futures
+
+
+    def send_symbol_reports(self, symbol: str, emails: list[str], emailer: SimpleEmailer) -> None:
+        """Construit le rapport d'une crypto puis l'envoie à chacun de ses destinataires."""
+
+        print(f"TÂCHE EXÉCUTÉE : Génération du rapport pour {symbol} à destination de {len(emails)} destinataire(s)...")
+        reports = self.build_symbol_report(symbol)
+        if reports is None:
             return
-        
+
+        (png_30d, stats_30d), (png_7d, stats_7d) = reports
         subject = f"Rapport Crypto {symbol} : 30j ({stats_30d['percent']:+.1f}%) | 7j ({stats_7d['percent']:+.1f}%)"
-        image_paths = [str(generated_path_30d), str(generated_path_7d)]
-        
-        # Envoi et nettoyage
+        html_body = emailer.build_report_html(symbol, stats_30d, stats_7d)
+        images = [png_30d, png_7d]
+
+        # Envoi à chaque destinataire des mêmes images en mémoire
+        sends = {
+            recipient_email: self.report_pool.submit('send', f"email {symbol} -> {recipient_email}",
+                                                     emailer.send_html_with_images, recipient_email, subject, html_body, images)
+            for recipient_email in emails
+        }
+        for recipient_email, future in sends.items():
+            try:
+                future.result()
+                print(f"Email rapports pour {symbol} envoyé avec succès à {recipient_email}.")
+            except Exception as e:
+                print(f"Échec de l'envoi de l'email à {recipient_email} : {e}")
+
+
+    def send_due_reports(self, now: datetime | None = None) -> list[Future]:
+        """Regroupe par crypto toutes les tâches dont l'heure d'envoi est passée et les traite en un seul lot.
+           Seules les tâches dues sont lues (index sur next_run_at), puis reportées à leur prochaine échéance.
+        """
+        now = now or datetime.now()
+        due = self.db.get_due_schedules(now)
+        if not due:
+            return []
+
+        recipients = {}
+        for job_id, symbol, email, frequency in due:
+            recipients.setdefault(symbol, []).append(email)
+        # Reportées (en BDD et dans le scheduler) avant l'envoi : les autres tâches du lot, dues à la même heure, ne le relancent pas
+        for job_id, next_run in self.db.mark_done([job_id for job_id, *_ in due], now).items():
+            self.scheduler.schedule(job_id, next_run, self.run_due_reports)
+
+        print(f"Lot de rapports : {len(due)} envoi(s) pour {len(recipients)} crypto(s).")
+        return self.send_report_batch(recipients)
+
+
+    def run_due_reports(self) -> None:
+        """Tâche du scheduler : envoie le lot des tâches dues puis, quoi qu'il arrive (BDD verrouillée, erreur d'envoi...),
+           réaligne le scheduler sur la BDD pour qu'aucune tâche ne soit perdue. Après un échec, les tâches
+           encore dues sont retentées une minute plus tard.
+        """
+        retry_at = None
         try:
-            emailer = SimpleEmailer(user=sender_email, password=sender_pass)
-            html_body = emailer.build_report_html(symbol, stats_30d, stats_7d)
-            emailer.send_html_with_images(recipient_email, subject, html_body, image_paths)
-            print(f"Email rapports pour {symbol} envoyé avec succès à {recipient_email}.")
-            
+            self.send_due_reports()
         except Exception as e:
-            print(f"Échec de l'envoi de l'email : {e}")
-            
-        finally:
-            generated_path_30d.unlink(missing_ok=True)
-            generated_path_7d.unlink(missing_ok=True)
-        
+            retry_at = datetime.now() + timedelta(minutes=1)
+            print(f"ERREUR lors de l'envoi des rapports dus : {e}, nouvel essai dans une minute.")
+        try:
+            self.sync_schedules(not_before=retry_at)
+        except Exception as e:
+            print(f"ERREUR lors de la reprogrammation des tâches : {e}, nouvel essai dans une minute.")
+            self.scheduler.schedule('retry', datetime.now() + timedelta(minutes=1), self.run_due_reports)
 
 
     def setup_schedules(self) -> None:
-        """Lit la BDD et configure toutes les tâches avec la bibliothèque 'schedule'."""
+        """Programme chaque tâche enregistrée en BDD à sa prochaine heure d'envoi.
+           Les tâches manquées pendant un arrêt sont dues immédiatement : elles partent dans le premier lot.
+        """
         print("Configuration des tâches planifiées...")
-        schedules = self.db.get_all_schedules()
-        
-        for schedule_item in schedules:
-            
-            symbol, email, freq = schedule_item[1], schedule_item[2], schedule_item[3]
-            
-            if freq == 'daily':
-                schedule.every().day.at(TIME_SCHEDULER).do(self.send_report_email, symbol=symbol, recipient_email=email)
-                
-            elif freq == 'weekly':
-                schedule.every().sunday.at(TIME_SCHEDULER).do(self.send_report_email, symbol=symbol, recipient_email=email)
-            elif freq == 'monthly':
-                schedule.every().month.on(1, TIME_SCHEDULER).do(self.send_report_email, symbol=symbol, recipient_email=email)
-        
-        print(f"{len(schedule.get_jobs())} tâches configurées.")
+        for job_id, next_run in self.db.get_next_runs().items():
+            self.scheduler.schedule(job_id, next_run, self.run_due_reports)
+        next_run = self.scheduler.next_run_at()
+        print(f"{len(self.db.get_all_schedules())} envois planifiés" + (f", prochain lot le {next_run:%d/%m/%Y à %H:%M}." if next_run else "."))
 
 
     def run_pending_tasks(self) -> None:
-        """Boucle infinie qui exécute les tâches en attente. Tourne dans le thread principal."""
+        """Boucle du scheduler, dans le thread principal : elle dort jusqu'à la prochaine échéance
+           (ou jusqu'à l'ajout / la suppression d'une tâche) au lieu de se réveiller chaque seconde.
+           Les tâches ne font que soumettre les rapports au pool : la boucle n'est jamais bloquée par un envoi.
+        """
         print("Le scheduler est en marche et surveille les tâches...")
+        self.scheduler.run()
+
+
+    def sync_schedules(self, not_before: datetime | None = None) -> None:
+        """Aligne le scheduler sur la BDD : tâches ajoutées, supprimées ou reportées par d'autres processus.
+           not_before : les tâches dues avant cette heure (échec du dernier lot) y sont repoussées.
+        """
+        stored = self.db.get_next_runs()
+        scheduled = self.scheduler.scheduled()
+        for job_id in scheduled.keys() - stored.keys():
+            self.scheduler.cancel(job_id)
+        for job_id, next_run in stored.items():
+            if not_before is not None:
+                next_run = max(next_run, not_before)
+            if scheduled.get(job_id) != next_run:
+                self.scheduler.schedule(job_id, next_run, self.run_due_reports)
+
+
+    def follow_schedules(self, interval=SCHEDULER_SYNC_INTERVAL) -> None:
+        """Boucle qui relit les tâches en BDD dès qu'un autre processus les a modifiées (vérification toutes les 'interval' secondes)."""
+        version = self.db.data_version()
         while True:
-            schedule.run_pending()
-            # On attend un peu pour éviter de surcharger le CPU                
-            time.sleep(1)
-            
+            time.sleep(interval)
+            if (current := self.db.data_version()) != version:
+                version = current
+                self.sync_schedules()
+
+
+    def start_scheduler_leader(self, lock_path=SCHEDULER_LOCK_PATH) -> None:
+        """Mode multi-processus : chaque worker attend en tâche de fond le verrou du scheduler ;
+           celui qui l'obtient fait tourner le scheduler (un seul envoi par tâche) et le préchauffage. Si ce worker s'arrête,
+           le verrou est libéré par le système et un autre worker prend le relais.
+        """
+        import fcntl
+
+        def lead():
+            lock_file = open(lock_path, 'w')
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # bloquant jusqu'à la libération du verrou
+            print(f"Worker {os.getpid()} : scheduler et préchauffage actifs.")
+            self.setup_schedules()
+            # Vues préchauffées par ce seul worker, servies aux autres par le cache partagé
+            self.snapshot_warmer.start()
+            threading.Thread(target=self.follow_schedules, daemon=True, name="scheduler-sync").start()
+            self.run_pending_tasks()
+
+        threading.Thread(target=lead, daemon=True, name="scheduler-leader").start()
 
 
     def lancer(self, host='0.0.0.0', port=5000, use_reloader=False)-> None:
-        """Orchestre le démarrage de l'application."""
+        """Orchestre le démarrage de l'application (un seul processus, serveur de développement Flask).
+           En production, préférer plusieurs workers : gunicorn -c gunicorn.conf.py wsgi:app
+        """
         # On configure les tâches à partir de la BDD
         self.setup_schedules()
 
+        # Relevés système en tâche de fond pour la page de monitoring
+        self.system_sampler.start()
+
+        # Préchauffage des vues du dashboard
+        self.snapshot_warmer.start()
+
         # On lance le serveur Flask dans un thread d'arrière-plan
         print(f"Démarrage du serveur web sur http://{host}:{port}")
         flask_thread = threading.Thread(
@@ -214,100 +343,28 @@ class SiteWebLocal:
 
     def api_historique(self)-> jsonify:
         """ Endpoint API qui génère un graphique d'analyse technique pour une crypto donnée.
-            Extrait les données, effectue l'analyse technique, et retourne le graphique au format JSON
+            La réponse, précalculée par le préchauffage ou mise en cache jusqu'à la clôture de la bougie en cours,
+            est servie compressée en gzip avec un ETag (304 si le navigateur l'a déjà).
         """
         try:
             # Récupération des paramètres de la requête
             symbol = request.args.get('crypto', 'BTCUSDC')
             profondeur = request.args.get('profondeur', '1m')
-            
-            # Logique pour start_date et interval
-            now = datetime.now()
-            interval = Client.KLINE_INTERVAL_4HOUR
-            start_date = now - timedelta(days=30)
-            if profondeur == '1j':
-                start_date = now - timedelta(days=1); interval = Client.KLINE_INTERVAL_5MINUTE
-            elif profondeur == '1s':
-                start_date = now - timedelta(weeks=1); interval = Client.KLINE_INTERVAL_1HOUR
-            elif profondeur == '1m':
-                start_date = now - timedelta(days=30); interval = Client.KLINE_INTERVAL_4HOUR
-            elif profondeur == '1a':
-                start_date = now - timedelta(days=365); interval = Client.KLINE_INTERVAL_1DAY
-            elif profondeur == '5a':
-                start_date = now - timedelta(days=365*5); interval = Client.KLINE_INTERVAL_1WEEK
-
-            # --- Récupération des données brutes ---
-            df_raw = self.binance_api.get_historical_data(symbol, interval, str(start_date))
-            if df_raw is None or df_raw.is_empty():
+            if profondeur not in PROFONDEURS:
+                profondeur = '1m'
+
+            body = self.historique_snapshot(symbol, profondeur)
+            if body is None:
                 return jsonify({'error': 'Impossible de récupérer les données.'})
 
-            # --- Analyse technique ---
-            df_ma = self.chart_builder.add_moving_averages(df_raw, PERIOD_SHORT, PERIOD_LONG)
-            df_pivots = self.chart_builder.add_pivot_levels(df_ma, PERIOD_SUPPORT)
-            df_analyzed = self.chart_builder.add_oscillators(df_pivots)
-            
-            summary_stats = self.chart_builder.add_summary_stats(df_analyzed)
-
-            # --- Extraction des données en listes ---
-            x_data = df_analyzed.get_column('Open Time').dt.strftime('%Y-%m-%dT%H:%M:%S').to_list()
-            open_data = df_analyzed.get_column('Open').to_list()
-            high_data = df_analyzed.get_column('High').to_list()
-            low_data = df_analyzed.get_column('Low').to_list()
-            close_data = df_analyzed.get_column('Close').to_list()
-            volume_data = df_analyzed.get_column('Volume').to_list()
-            ma_short_data = df_analyzed.get_column('MA_short').to_list()
-            ma_long_data = df_analyzed.get_column('MA_long').to_list()
-            rsi_data = df_analyzed.get_column('RSI_14').to_list()
-            macd_line_data = df_analyzed.get_column('MACD_line').to_list()
-            macd_signal_data = df_analyzed.get_column('MACD_signal').to_list()
-            macd_hist_data = df_analyzed.get_column('MACD_hist').to_list()
-            support_levels = df_analyzed.get_column("Support").drop_nulls().unique().to_list()
-            resistance_levels = df_analyzed.get_column("Resistance").drop_nulls().unique().to_list()
-
-            # --- Création de la figure pltolty avec 3 panneaux ---
-            fig = make_subplots(
-                rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.04,
-                row_heights=[0.65, 0.15, 0.20],
-                specs=[[{"secondary_y": True}], [{"secondary_y": False}], [{"secondary_y": False}]]
-            )
-
-            # Panneau 1 : Prix (alimenté par les listes)
-            fig.add_trace(go.Candlestick(x=x_data, open=open_data, high=high_data, low=low_data, close=close_data, name='Cours'), row=1, col=1)
-            fig.add_trace(go.Scatter(x=x_data, y=ma_short_data, mode='lines', name='MA Courte', line={'color': 'orange'}), row=1, col=1)
-            fig.add_trace(go.Scatter(x=x_data, y=ma_long_data, mode='lines', name='MA Longue', line={'color': 'purple'}), row=1, col=1)
-            for level in support_levels: fig.add_hline(y=level, line_dash="dash", line_color="rgba(40, 167, 69, 0.7)", row=1, col=1)
-            for level in resistance_levels: fig.add_hline(y=level, line_dash="dash", line_color="rgba(220, 53, 69, 0.7)", row=1, col=1)
-            
-            # Panneau 1 (bis) : Volume
-            fig.add_trace(go.Bar(x=x_data, y=volume_data, name='Volume', marker_color='rgba(150,150,150,0.3)'), secondary_y=True, row=1, col=1)
-            
-            # Panneau 2 : RSI
-            fig.add_trace(go.Scatter(x=x_data, y=rsi_data, name='RSI', line={'color': 'blue'}), row=2, col=1)
-            fig.add_hline(y=70, line_dash="dash", line_color="rgba(239, 83, 80, 0.5)", row=2, col=1)
-            fig.add_hline(y=30, line_dash="dash", line_color="rgba(38, 166, 154, 0.5)", row=2, col=1)
-
-            # Panneau 3 : MACD
-            fig.add_trace(go.Scatter(x=x_data, y=macd_line_data, name='MACD', line={'color': 'navy'}), row=3, col=1)
-            fig.add_trace(go.Scatter(x=x_data, y=macd_signal_data, name='Signal', line={'color': 'cyan'}), row=3, col=1)
-            fig.add_trace(go.Bar(x=x_data, y=macd_hist_data, name='Histogramme', marker_color='rgba(150,150,150,0.5)'), row=3, col=1)
-
-            # --- Mise en forme finale et conversion JSON ---
-            fig.update_layout(
-                #title_text=f'Analyse Technique pour {self.cryptos.get(symbol, symbol)}',
-                height=850,
-                showlegend=True,
-                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-                xaxis_rangeslider_visible=False,
-                yaxis=dict(title="Prix (USDC)"),
-                yaxis2=dict(title="Volume", showgrid=False),
-                yaxis3=dict(title="RSI"),
-                yaxis4=dict(title="MACD")
-            )
-            
-            graph_json = json.loads(fig.to_json())
-            graph_json['summary_stats'] = summary_stats
-
-            return jsonify(graph_json)
+            accepts_gzip = request.accept_encodings['gzip'] > 0
+            response = self.app.response_class(body if accepts_gzip else gzip.decompress(body), mimetype='application/json')
+            if accepts_gzip:
+                response.headers['Content-Encoding'] = 'gzip'
+            response.headers['Vary'] = 'Accept-Encoding'
+            response.headers['Cache-Control'] = 'no-cache'  # le navigateur revalide avec l'ETag
+            response.set_etag(payload_etag(body) + ('' if accepts_gzip else '-raw'))
+            return response.make_conditional(request)
 
         except Exception as e:
             print(f"Erreur dans api_historique : {e}")
@@ -315,53 +372,90 @@ class SiteWebLocal:
             traceback.print_exc()
             return jsonify({'error': 'Une erreur interne est survenue lors de la création du graphique.'})
 
-    
-    
+
+    def historique_snapshot(self, symbol: str, profondeur: str) -> bytes | None:
+        """ Réponse de api_historique (JSON compressé gzip), lue en cache ou calculée.
+            Clé de cache : (symbol, profondeur, ouverture de la bougie en cours), valable jusqu'à sa clôture.
+        """
+        from binance.helpers import interval_to_milliseconds
+
+        interval = PROFONDEURS[profondeur][1]
+        open_time = candle_open_time(interval)
+        expires_at = open_time + interval_to_milliseconds(interval) // 1000
+
+        def compute():
+            payload = self.build_historique(symbol, profondeur)
+            return compress_payload(payload) if payload is not None else None
+
+        return self.response_cache.get_or_compute((symbol, profondeur, open_time), expires_at, compute)
+
+
+    def api_stream(self) -> Response:
+        """ Endpoint Server-Sent Events : pousse la dernière bougie et ses indicateurs à chaque mise à jour du flux en direct. """
+        symbol = request.args.get('crypto', 'BTCUSDC')
+        profondeur = request.args.get('profondeur', '1m')
+        if profondeur not in PROFONDEURS:
+            profondeur = '1m'
+        if symbol not in self.cryptos:
+            return jsonify({'error': f'Crypto inconnue : {symbol}'}), 400
+        days, interval = PROFONDEURS[profondeur]
+
+        # Chaque flux garde un thread du worker jusqu'à la déconnexion : au-delà du plafond, les pages et l'API
+        # n'auraient plus de thread pour répondre
+        if not self.stream_slots.acquire(blocking=False):
+            return jsonify({'error': 'Trop de flux en direct ouverts, réessayez plus tard.'}), 503, {'Retry-After': '30'}
+        subscription = None
+        try:
+            subscription = self.live_market.listen(symbol, interval, days)
+        finally:
+            if subscription is None:
+                self.stream_slots.release()
+        if subscription is None:
+            return jsonify({'error': 'Impossible de récupérer les données.'})
+
+        stream, listener = subscription
+        response = Response(
+            self.live_market.events(symbol, interval, stream, listener),
+            mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+        # Désabonnement et place libérés à la fermeture de la réponse, même si le générateur n'a jamais démarré
+        # (déconnexion avant le premier événement, requête HEAD) et ne passe donc pas par son 'finally'
+        response.call_on_close(lambda: self.live_market.unlisten(symbol, interval, stream, listener))
+        response.call_on_close(self.stream_slots.release)
+        return response
+
+
+    def build_historique(self, symbol: str, profondeur: str) -> bytes | None:
+        """ Extrait les données, effectue l'analyse technique, et retourne le graphique sérialisé en JSON.
+            Retourne None si les données ne sont pas disponibles.
+        """
+        days, interval = PROFONDEURS[profondeur]
+        start_date = datetime.now() - timedelta(days=days)
+
+        # --- Récupération des données brutes ---
+        df_raw = self.binance_api.get_historical_data(symbol, interval, str(start_date))
+        if df_raw is None or df_raw.is_empty():
+            return None
+
+        # --- Analyse technique : un seul plan Polars, limité aux colonnes du graphique ---
+        df_analyzed = self.chart_builder.analyze(df_raw, CHART_COLUMNS)
+
+        summary_stats = self.chart_builder.add_summary_stats(df_analyzed)
+
+        # --- Sérialisation colonnaire, les traces Plotly sont assemblées par le dashboard ---
+        return self.chart_builder.build_chart_payload(df_analyzed, summary_stats)
+
+
     def get_system_stats(self)-> jsonify:
-        """ Endpoint API qui retourne les statistiques système au format JSON. """
-        # Usage CPU
-        cpu_usage = psutil.cpu_percent(interval=1)
-        cpu_cores_usage = psutil.cpu_percent(interval=None, percpu=True)
-
-        # Température CPU
-        temps = psutil.sensors_temperatures()
-        cpu_temp = 0.0
-        # La clé peut varier, on cherche celle du CPU du Pi
-        if 'cpu_thermal' in temps:
-            cpu_temp = temps['cpu_thermal'][0].current
-        elif 'coretemp' in temps: # Pour d'autres systèmes Linux
-            cpu_temp = temps['coretemp'][0].current
-
-        # Usage RAM
-        ram = psutil.virtual_memory()
-        ram_total = ram.total / (1024**3) # Convertir en Go
-        ram_used = ram.used / (1024**3)
-        ram_percent = ram.percent
-
-        # Usage Disque (pour la partition racine '/')
-        disk = psutil.disk_usage('/')
-        disk_total = disk.total / (1024**3) # Convertir en Go
-        disk_used = disk.used / (1024**3)
-        disk_percent = disk.percent
-
-        # On rassemble tout dans un dictionnaire
-        stats = {
-            'cpu_usage': cpu_usage,
-            'cpu_cores_usage': cpu_cores_usage,
-            'cpu_temp': round(cpu_temp, 1),
-            'ram': {
-                'total': round(ram_total, 2),
-                'used': round(ram_used, 2),
-                'percent': ram_percent
-            },
-            'disk': {
-                'total': round(disk_total, 2),
-                'used': round(disk_used, 2),
-                'percent': disk_percent
-            }
-        }
-        
-        return jsonify(stats)    
+        """ Endpoint API qui retourne les statistiques système au format JSON.
+            Le dernier relevé du thread de fond est renvoyé immédiatement ; le paramètre 'history'
+            ajoute les séries des N derniers relevés (mini-graphiques).
+        """
+        stats = dict(self.system_sampler.latest())
+        history = request.args.get('history', 0, type=int)
+        if history > 0:
+            stats['history'] = self.system_sampler.history(history)
+        return jsonify(stats)
 
 
 if __name__ == '__main__':
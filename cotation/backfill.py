@@ -0,0 +1,114 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import polars as pl
+
+from cotations import klines_to_frame, parse_klines
+from info import BACKFILL_WORKERS, BINANCE_WEIGHT_PER_MINUTE, BINANCE_TIMEOUT
+
+
+class TokenBucket:
+    """Limiteur de débit : 'capacity' jetons au plus, regénérés à 'rate' jetons par seconde."""
+
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, tokens=1) -> None:
+        """Attend que 'tokens' jetons soient disponibles puis les consomme."""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                delay = (tokens - self.tokens) / self.rate
+            time.sleep(delay)
+
+    def sync(self, used, limit) -> None:
+        """Se recale sur le poids déjà consommé annoncé par le serveur (autres clients sur la même IP...)."""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, limit - used)
+
+
+class BulkKlineFetcher:
+    """
+    Téléchargement de longues plages de bougies : la plage est découpée en pages de 1000 bougies téléchargées
+    en parallèle, dans la limite du poids de requêtes Binance (en-tête X-MBX-USED-WEIGHT-1M), avec reprise
+    sur erreur. Les pages sont fusionnées dans l'ordre, sans doublons.
+    """
+    BASE_URL = 'https://api.binance.com'
+    PAGE_SIZE = 1000
+    REQUEST_WEIGHT = 2  # poids d'un appel /api/v3/klines de 1000 bougies
+
+    def __init__(self, base_url=BASE_URL, workers=BACKFILL_WORKERS, weight_per_minute=BINANCE_WEIGHT_PER_MINUTE,
+                 retries=5, backoff=0.5, timeout=BINANCE_TIMEOUT, session=None):
+        self.base_url = base_url
+        self.workers = workers
+        self.weight_per_minute = weight_per_minute
+        self.limiter = TokenBucket(weight_per_minute, weight_per_minute / 60)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._session = session
+
+    @property
+    def session(self):
+        """Session HTTP : par défaut celle (et ses connexions ouvertes) du client Binance partagé, créé au premier usage."""
+        if self._session is None:
+            from exchange import get_client
+            self._session = get_client().session
+        return self._session
+
+    def fetch(self, symbol, interval, start, end=None) -> pl.DataFrame:
+        """Retourne les bougies de [start, end] (start/end en ms ou en texte, ex. "1 Jan 2020")."""
+        from binance.helpers import convert_ts_str, interval_to_milliseconds
+
+        start_ms = convert_ts_str(start)
+        end_ms = convert_ts_str(end) if end is not None else int(time.time() * 1000)
+        page_ms = self.PAGE_SIZE * interval_to_milliseconds(interval)
+        pages = [(page_start, min(page_start + page_ms - 1, end_ms)) for page_start in range(start_ms, end_ms + 1, page_ms)]
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="backfill") as executor:
+            frames = list(executor.map(lambda page: self.fetch_page(symbol, interval, *page), pages))
+        if not frames:
+            return klines_to_frame([])
+        # Fusion ordonnée et dédoublonnée sur l'heure d'ouverture
+        return pl.concat(frames).unique("Open Time", keep="last").sort("Open Time")
+
+    def fetch_page(self, symbol, interval, start_ms, end_ms) -> pl.DataFrame:
+        """Télécharge une page de bougies, en respectant le limiteur et en réessayant sur erreur temporaire."""
+        import requests
+
+        params = {'symbol': symbol, 'interval': interval, 'startTime': start_ms, 'endTime': end_ms, 'limit': self.PAGE_SIZE}
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire(self.REQUEST_WEIGHT)
+            delay = self.backoff * 2 ** attempt
+            try:
+                response = self.session.get(f"{self.base_url}/api/v3/klines", params=params, timeout=self.timeout)
+                used = response.headers.get('X-MBX-USED-WEIGHT-1M')
+                if used is not None:
+                    self.limiter.sync(int(used), self.weight_per_minute)
+                if response.status_code in (418, 429) or response.status_code >= 500:
+                    # Limite dépassée (429, puis bannissement temporaire 418) ou incident serveur : on patiente
+                    delay = max(delay, float(response.headers.get('Retry-After', 0)))
+                    raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+                response.raise_for_status()
+                # Corps JSON décodé directement en colonnes, sans listes Python intermédiaires
+                return parse_klines(response.content)
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                status = e.response.status_code if isinstance(e, requests.HTTPError) and e.response is not None else None
+                if attempt == self.retries or (status is not None and status < 500 and status not in (418, 429)):
+                    raise
+                print(f"Bougies {symbol} {interval} ({start_ms}) : {e}, nouvel essai dans {delay:.1f}s")
+                time.sleep(delay)
@@ -0,0 +1,55 @@
+import multiprocessing
+import resource
+import time
+
+from analysis import TechnicalChartBuilder, CHART_COLUMNS
+from bench_historique import synthetic_ohlcv
+from info import PERIOD_SHORT, PERIOD_LONG, PERIOD_SUPPORT
+
+# Benchmark de la chaîne d'analyse : étapes eager successives (add_moving_averages -> add_pivot_levels -> add_oscillators)
+# contre un seul plan paresseux limité aux colonnes utiles. Chaque mesure tourne dans un processus neuf pour lire
+# son pic mémoire (ru_maxrss). Données synthétiques, aucun appel réseau.
+
+LENGTHS = (100_000, 1_000_000)
+SCREENER_COLUMNS = ["Open Time", "Close", "RSI_14"]
+
+
+def eager_chain(builder, df):
+    df_ma = builder.add_moving_averages(df, PERIOD_SHORT, PERIOD_LONG)
+    df_pivots = builder.add_pivot_levels(df_ma, PERIOD_SUPPORT)
+    df_analyzed = builder.add_oscillators(df_pivots)
+    return df_analyzed, builder.add_summary_stats(df_analyzed)
+
+
+VARIANTS = {
+    'rapport eager': lambda builder, df: eager_chain(builder, df),
+    'rapport plan': lambda builder, df: builder.add_summary_stats(builder.analyze(df, CHART_COLUMNS)),
+    'filtre eager': lambda builder, df: eager_chain(builder, df)[0].select(SCREENER_COLUMNS).tail(1),
+    'filtre plan': lambda builder, df: builder.analyze(df, SCREENER_COLUMNS, last_only=True),
+}
+
+
+def measure(variant, n, results):
+    """Dans un processus dédié : durée d'un appel (meilleur de 3) et hausse du pic mémoire au-delà des données d'entrée."""
+    builder = TechnicalChartBuilder()
+    df = synthetic_ohlcv(n, 5)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        VARIANTS[variant](builder, df)
+        best = min(best, time.perf_counter() - start)
+    results.put((best * 1000, (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) / 1024))
+
+
+if __name__ == "__main__":
+    context = multiprocessing.get_context('spawn')
+    print(f"{'bougies':>10}  {'chaîne':<15}{'durée (ms)':>12}{'pic mémoire (Mo)':>18}")
+    for n in LENGTHS:
+        for variant in VARIANTS:
+            results = context.Queue()
+            process = context.Process(target=measure, args=(variant, n, results))
+            process.start()
+            duration, peak = results.get()
+            process.join()
+            print(f"{n:>10}  {variant:<15}{duration:>12.1f}{peak:>18.1f}")
@@ -0,0 +1,111 @@
+import tempfile
+import time
+from pathlib import Path
+
+import mplfinance as mpf
+import polars as pl
+
+from analysis import TechnicalChartBuilder
+from bench_historique import synthetic_ohlcv
+from info import PERIOD_SHORT, PERIOD_LONG, PERIOD_SUPPORT
+
+# Benchmark du rendu des graphiques des rapports : ancien rendu mplfinance à froid
+# contre le moteur à figure pré-construite (charts.ChartRenderer). Données synthétiques, aucun appel réseau.
+
+SIZES = {'7j en 1h': 168, '30j en 4h': 180, '1 an en 1j': 365}
+
+
+def mplfinance_chart(df_analyzed: pl.DataFrame, symbol: str, file_path) -> Path | None:
+    """Ancien rendu : conversion pandas puis figure mplfinance complète reconstruite à chaque appel."""
+
+    if df_analyzed is None or df_analyzed.is_empty():
+        return None
+
+    # 1. Calculs et préparation des données, pandas nécessaire pour mplfinance
+    df_pandas = df_analyzed.to_pandas().set_index('Open Time')
+
+    supports = df_pandas['Support'].dropna().unique().tolist()
+    resistances = df_pandas['Resistance'].dropna().unique().tolist()
+    hlines = dict(hlines=supports + resistances, 
+                  colors=['g'] * len(supports) + ['r'] * len(resistances), 
+                  linestyle='--')
+
+    # Préparation des tracés additionnels
+    additional_plots = []
+
+    # Moyennes Mobiles (panel 0)
+    if 'MA_short' in df_pandas.columns and not df_pandas['MA_short'].isnull().all():
+        additional_plots.append(mpf.make_addplot(df_pandas['MA_short'], color='orange'))
+    if 'MA_long' in df_pandas.columns and not df_pandas['MA_long'].isnull().all():
+        additional_plots.append(mpf.make_addplot(df_pandas['MA_long'], color='purple'))
+
+    # Volume (panel 0, axe Y secondaire)
+    if 'Volume' in df_pandas.columns:
+        additional_plots.append(mpf.make_addplot(df_pandas['Volume'], type='bar', panel=0, color='gray', alpha=0.3, secondary_y=True))
+
+    next_panel = 1
+
+    # RSI (panel 1)
+    if 'RSI_14' in df_pandas.columns and not df_pandas['RSI_14'].isnull().all():
+        additional_plots.append(mpf.make_addplot(df_pandas['RSI_14'], panel=next_panel, color='blue', ylabel='RSI'))
+        next_panel += 1
+
+    # MACD (panel 2)
+    if 'MACD_line' in df_pandas.columns and not df_pandas['MACD_line'].isnull().all():
+        macd_plots = [
+            mpf.make_addplot(df_pandas['MACD_line'], panel=next_panel, color='navy', ylabel='MACD'),
+            mpf.make_addplot(df_pandas['MACD_signal'], panel=next_panel, color='cyan'),
+            mpf.make_addplot(df_pandas['MACD_hist'], type='bar', panel=next_panel, color='gray', alpha=0.5)
+        ]
+        additional_plots.extend(macd_plots)
+        next_panel += 1
+
+    # 3. Génération du graphique
+    try:
+        image_path = Path(file_path)
+        image_path.parent.mkdir(parents=True, exist_ok=True)
+
+        panel_ratios_list = (6, 2, 2)
+
+        mpf.plot(
+            df_pandas,
+            type='candle', style='yahoo', title=f'\nAnalyse Technique {symbol}',
+            ylabel='Cours (USDC)',
+            volume=False,
+            addplot=additional_plots if additional_plots else None,
+            panel_ratios=panel_ratios_list,
+            hlines=hlines, figratio=(12, 8), figscale=1.2,
+            savefig=str(image_path)
+        )
+
+        #print(f"Image compacte générée avec succès via Matplotlib : {image_path}")
+        return image_path
+
+    except Exception as e:
+        print(f"Erreur lors de la génération de l'image avec Matplotlib : {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+
+def renders_per_second(fn, repeat=10) -> float:
+    """Nombre de rendus par seconde (après un premier rendu de chauffe)."""
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return repeat / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    builder = TechnicalChartBuilder()
+    print(f"{'rapport':<14}{'bougies':>9}{'mplfinance (rendus/s)':>24}{'moteur (rendus/s)':>20}{'gain':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, n in SIZES.items():
+            df = builder.add_moving_averages(synthetic_ohlcv(n, 60), PERIOD_SHORT, PERIOD_LONG)
+            df = builder.add_oscillators(builder.add_pivot_levels(df, PERIOD_SUPPORT))
+
+            before = renders_per_second(lambda: mplfinance_chart(df, 'BTCUSDC', Path(tmp) / 'mpf.png'))
+            after = renders_per_second(lambda: builder.generate_chart_image(df, 'BTCUSDC', Path(tmp) / 'fast.png'))
+            print(f"{name:<14}{n:>9}{before:>24.1f}{after:>20.1f}{after / before:>7.1f}x")
@@ -0,0 +1,85 @@
+import json
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import polars as pl
+
+from analysis import TechnicalChartBuilder
+from info import PERIOD_SHORT, PERIOD_LONG, PERIOD_SUPPORT
+
+# Benchmark de la sérialisation de /api/historique : ancien chemin Plotly (to_json -> json.loads -> jsonify)
+# contre le payload colonnaire écrit directement par Polars. Données synthétiques, aucun appel réseau.
+
+VIEWS = {'1j': (288, 5), '5a': (261, 7 * 24 * 60), '2000 bougies': (2_000, 5)}  # (nombre de bougies, minutes par bougie)
+
+
+def synthetic_ohlcv(n, step_minutes) -> pl.DataFrame:
+    """Génère une marche aléatoire OHLCV."""
+    rng = np.random.default_rng(42)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    open_ = np.r_[close[0], close[:-1]]
+    start = datetime(2020, 1, 1)
+    return pl.DataFrame({
+        "Open Time": pl.datetime_range(start, start + timedelta(minutes=step_minutes * (n - 1)), timedelta(minutes=step_minutes), time_unit="ms", eager=True),
+        "Open": open_, "High": np.maximum(open_, close) + rng.random(n), "Low": np.minimum(open_, close) - rng.random(n),
+        "Close": close, "Volume": rng.random(n) * 10,
+    })
+
+
+def legacy_payload(df_analyzed, summary_stats) -> bytes:
+    """Ancienne construction : listes Python, figure Plotly, puis triple sérialisation."""
+    # Plotly n'est utilisé que par ce benchmark (requirements-bench.txt) : synthetic_ohlcv reste importable sans lui
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    x_data = df_analyzed.get_column('Open Time').dt.strftime('%Y-%m-%dT%H:%M:%S').to_list()
+    fig = make_subplots(
+        rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.04,
+        row_heights=[0.65, 0.15, 0.20],
+        specs=[[{"secondary_y": True}], [{"secondary_y": False}], [{"secondary_y": False}]]
+    )
+    fig.add_trace(go.Candlestick(x=x_data, open=df_analyzed['Open'].to_list(), high=df_analyzed['High'].to_list(),
+                                 low=df_analyzed['Low'].to_list(), close=df_analyzed['Close'].to_list(), name='Cours'), row=1, col=1)
+    fig.add_trace(go.Scatter(x=x_data, y=df_analyzed['MA_short'].to_list(), mode='lines', name='MA Courte'), row=1, col=1)
+    fig.add_trace(go.Scatter(x=x_data, y=df_analyzed['MA_long'].to_list(), mode='lines', name='MA Longue'), row=1, col=1)
+    for level in df_analyzed['Support'].drop_nulls().unique().to_list(): fig.add_hline(y=level, line_dash="dash", row=1, col=1)
+    for level in df_analyzed['Resistance'].drop_nulls().unique().to_list(): fig.add_hline(y=level, line_dash="dash", row=1, col=1)
+    fig.add_trace(go.Bar(x=x_data, y=df_analyzed['Volume'].to_list(), name='Volume'), secondary_y=True, row=1, col=1)
+    fig.add_trace(go.Scatter(x=x_data, y=df_analyzed['RSI_14'].to_list(), name='RSI'), row=2, col=1)
+    fig.add_hline(y=70, line_dash="dash", row=2, col=1)
+    fig.add_hline(y=30, line_dash="dash", row=2, col=1)
+    fig.add_trace(go.Scatter(x=x_data, y=df_analyzed['MACD_line'].to_list(), name='MACD'), row=3, col=1)
+    fig.add_trace(go.Scatter(x=x_data, y=df_analyzed['MACD_signal'].to_list(), name='Signal'), row=3, col=1)
+    fig.add_trace(go.Bar(x=x_data, y=df_analyzed['MACD_hist'].to_list(), name='Histogramme'), row=3, col=1)
+    fig.update_layout(height=850, xaxis_rangeslider_visible=False)
+
+    graph_json = json.loads(fig.to_json())
+    graph_json['summary_stats'] = summary_stats
+    return json.dumps(graph_json).encode()
+
+
+def timeit(fn, repeat) -> float:
+    """Temps moyen d'un appel en millisecondes."""
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+if __name__ == "__main__":
+    builder = TechnicalChartBuilder()
+    print(f"{'vue':<14}{'bougies':>9}{'avant (ms)':>12}{'après (ms)':>12}{'gain':>8}{'avant (Ko)':>12}{'après (Ko)':>12}")
+
+    for view, (n, step) in VIEWS.items():
+        df = builder.add_moving_averages(synthetic_ohlcv(n, step), PERIOD_SHORT, PERIOD_LONG)
+        df = builder.add_oscillators(builder.add_pivot_levels(df, PERIOD_SUPPORT))
+        stats = builder.add_summary_stats(df)
+        repeat = 20 if n < 1_000 else 3
+
+        before = timeit(lambda: legacy_payload(df, stats), repeat)
+        after = timeit(lambda: builder.build_chart_payload(df, stats), repeat)
+        size_before = len(legacy_payload(df, stats)) / 1024
+        size_after = len(builder.build_chart_payload(df, stats)) / 1024
+        print(f"{view:<14}{n:>9}{before:>12.2f}{after:>12.2f}{before / after:>7.1f}x{size_before:>12.1f}{size_after:>12.1f}")
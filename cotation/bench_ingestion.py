@@ -0,0 +1,96 @@
+import json
+import multiprocessing
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+import polars as pl
+
+from cotations import klines_to_frame, parse_klines
+
+# Benchmark de la construction des DataFrames de bougies : ancien chemin (réponse JSON décodée en listes Python,
+# puis une liste par champ et conversion des textes) contre klines_to_frame (tous les champs, un seul parcours des
+# lignes) et le décodage direct des réponses HTTP (parse_klines, page par page comme le téléchargement parallèle).
+# Chaque mesure tourne dans un processus neuf pour lire son pic mémoire (ru_maxrss). Données synthétiques, aucun
+# appel réseau.
+
+N_KLINES = 1_000_000
+PAGE_SIZE = 1000  # bougies par réponse de /api/v3/klines (limite Binance)
+
+
+def synthetic_body(n) -> bytes:
+    """Corps JSON de /api/v3/klines pour n bougies minute (12 champs, prix en texte)."""
+    start = 1_600_000_000_000
+    return json.dumps([
+        [start + i * 60_000, f"{100 + i % 97:.8f}", f"{101 + i % 97:.8f}", f"{99 + i % 97:.8f}", f"{100.5 + i % 97:.8f}",
+         f"{i % 13 + 0.5:.8f}", start + i * 60_000 + 59_999, f"{(i % 13) * 100.5:.8f}", i % 500, "6.10000000", "612.30000000", "0"]
+        for i in range(n)
+    ], separators=(',', ':')).encode()
+
+
+def write_body(path, n) -> None:
+    """Écrit le corps des n bougies, et à côté (path + '.pages') ses pages de PAGE_SIZE bougies, une par ligne."""
+    body = synthetic_body(n)
+    Path(path).write_bytes(body)
+    klines = json.loads(body)
+    pages = (json.dumps(klines[i:i + PAGE_SIZE], separators=(',', ':')) for i in range(0, n, PAGE_SIZE))
+    Path(path + ".pages").write_text("\n".join(pages))
+
+
+def legacy_frame(body) -> pl.DataFrame:
+    """Ancienne construction : six listes en compréhension puis conversion, champs complémentaires perdus."""
+    klines = json.loads(body)
+    df = pl.DataFrame({
+        "Open Time": [r[0] for r in klines], "Open": [r[1] for r in klines],
+        "High": [r[2] for r in klines], "Low": [r[3] for r in klines],
+        "Close": [r[4] for r in klines], "Volume": [r[5] for r in klines]
+    })
+    return df.with_columns(
+        pl.col("Open Time").cast(pl.Datetime(time_unit="ms")),
+        pl.col("Open", "High", "Low", "Close", "Volume").cast(pl.Float64),
+    )
+
+
+def parse_pages(pages) -> pl.DataFrame:
+    """Téléchargement parallèle (backfill) : chaque page est décodée à son arrivée, puis les pages sont fusionnées."""
+    return pl.concat([parse_klines(page) for page in pages])
+
+
+# Variante -> (entrée, construction) : le corps complet, ou ses pages telles que renvoyées par Binance
+VARIANTS = {
+    'listes par champ': ('', legacy_frame),
+    'klines_to_frame': ('', lambda body: klines_to_frame(json.loads(body))),
+    'parse_klines': ('.pages', parse_pages),
+}
+
+
+def measure(variant, body_path, results):
+    """Dans un processus dédié : durée du décodage JSON + construction, et hausse du pic mémoire au-delà des corps HTTP."""
+    suffix, build = VARIANTS[variant]
+    with open(body_path + suffix, 'rb') as f:
+        body = f.readlines() if suffix else f.read()
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    df = build(body)
+    duration = time.perf_counter() - start
+    results.put((duration, (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) / 1024, df.width))
+
+
+if __name__ == "__main__":
+    context = multiprocessing.get_context('spawn')
+    body_file = tempfile.NamedTemporaryFile(suffix=".json")
+    # Corps généré dans un processus à part : sous Linux, ru_maxrss d'un processus lancé hérite du pic de son parent
+    writer = context.Process(target=write_body, args=(body_file.name, N_KLINES))
+    writer.start()
+    writer.join()
+    print(f"{N_KLINES} bougies")
+    print(f"{'construction':<20}{'durée (s)':>11}{'pic mémoire (Mo)':>18}{'colonnes':>10}")
+    for variant in VARIANTS:
+        results = context.Queue()
+        process = context.Process(target=measure, args=(variant, body_file.name, results))
+        process.start()
+        duration, peak, width = results.get()
+        process.join()
+        print(f"{variant:<20}{duration:>11.2f}{peak:>18.1f}{width:>10}")
+    Path(body_file.name + ".pages").unlink()
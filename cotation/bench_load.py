@@ -0,0 +1,96 @@
+import http.client
+import statistics
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Test de charge du dashboard : USERS utilisateurs simulés enchaînent pendant DURATION secondes les requêtes d'une
+# visite (page, historique, stats système), chacun sur sa connexion keep-alive, pendant que STREAMS clients gardent
+# un flux en direct ouvert (/api/stream, un thread serveur chacun). À lancer contre un serveur démarré :
+#   python appl.py                             (un processus, serveur de développement Flask)
+#   gunicorn -c gunicorn.conf.py wsgi:app      (mode production, plusieurs workers)
+#   python bench_load.py http://raspberrypi:5000 8 16
+
+PATHS = (
+    '/dashboard',
+    '/api/historique?crypto=BTCUSDC&profondeur=1s',
+    '/api/historique?crypto=ETHUSDC&profondeur=1m',
+    '/api/system-stats',
+)
+STREAM_PATH = '/api/stream?crypto=BTCUSDC&profondeur=1m'
+DURATION = 30
+
+
+def simulate_user(base_url, stop, latencies, errors) -> None:
+    """Enchaîne les requêtes d'une visite jusqu'à 'stop', en relevant la latence de chaque réponse."""
+    url = urlsplit(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+    while not stop.is_set():
+        for path in PATHS:
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    raise http.client.HTTPException(f"HTTP {response.status}")
+                latencies.append(time.perf_counter() - start)
+            except (OSError, http.client.HTTPException) as e:
+                errors.append(f"{path} : {e}")
+                conn.close()
+
+
+def hold_stream(base_url, stop, opened, errors) -> None:
+    """Ouvre un flux en direct et le lit jusqu'à 'stop', comme une page de dashboard restée ouverte."""
+    url = urlsplit(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=1)
+    try:
+        conn.request('GET', STREAM_PATH)
+        response = conn.getresponse()
+        if response.status != 200:
+            raise http.client.HTTPException(f"HTTP {response.status}")
+        opened.append(1)
+        while not stop.is_set():
+            try:
+                if not response.fp.readline():
+                    raise http.client.HTTPException("flux fermé par le serveur")
+            except TimeoutError:
+                pass  # aucun événement dans la seconde : on vérifie 'stop'
+    except (OSError, http.client.HTTPException) as e:
+        errors.append(f"{STREAM_PATH} : {e}")
+    finally:
+        conn.close()
+
+
+def run_load(base_url, users, duration=DURATION, streams=0) -> dict:
+    stop = threading.Event()
+    latencies, errors, opened, stream_errors = [], [], [], []
+    threads = [threading.Thread(target=hold_stream, args=(base_url, stop, opened, stream_errors), daemon=True) for _ in range(streams)]
+    threads += [threading.Thread(target=simulate_user, args=(base_url, stop, latencies, errors), daemon=True) for _ in range(users)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return {
+        'requests': len(latencies), 'errors': len(errors), 'throughput': len(latencies) / duration,
+        'p50': statistics.median(latencies) if latencies else float('nan'),
+        'p95': latencies[int(len(latencies) * 0.95)] if latencies else float('nan'),
+        'streams': len(opened), 'stream_errors': len(stream_errors),
+    }
+
+
+if __name__ == "__main__":
+    base_url = sys.argv[1] if len(sys.argv) > 1 else 'http://127.0.0.1:5000'
+    max_users = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    streams = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    # Premier passage pour remplir les caches (bougies en base, réponses en cache)
+    run_load(base_url, 1, duration=5)
+    print(f"{'utilisateurs':>12} | {'req/s':>8} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | erreurs | flux ouverts (refusés)")
+    for users in sorted({1, max_users // 2, max_users} - {0}):
+        result = run_load(base_url, users, streams=streams)
+        print(f"{users:>12} | {result['throughput']:>8.1f} | {result['p50'] * 1000:>9.1f} | {result['p95'] * 1000:>9.1f} | "
+              f"{result['errors']:>7} | {result['streams']} ({result['stream_errors']})")
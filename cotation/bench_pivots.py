@@ -0,0 +1,47 @@
+import time
+
+import polars as pl
+from polars import col
+
+from analysis import TechnicalChartBuilder
+from bench_historique import synthetic_ohlcv
+
+# Benchmark de add_pivot_levels : ancienne détection par 2 * window comparaisons décalées (O(n·w))
+# contre les min/max glissants centrés (O(n)). Données synthétiques, aucun appel réseau.
+
+WINDOWS = (5, 10, 30, 50, 100)
+LENGTHS = (10_000, 100_000, 1_000_000)
+
+
+def legacy_pivot_levels(df, window_size) -> pl.DataFrame:
+    """Ancienne détection : une colonne de comparaison par décalage, pour Low et pour High."""
+    is_support = pl.all_horizontal([col("Low") <= col("Low").shift(i) for i in range(-window_size, window_size + 1) if i != 0])
+    is_resistance = pl.all_horizontal([col("High") >= col("High").shift(i) for i in range(-window_size, window_size + 1) if i != 0])
+    df = df.with_columns(
+        Support=pl.when(is_support).then(col("Low")).otherwise(None),
+        Resistance=pl.when(is_resistance).then(col("High")).otherwise(None)
+    )
+    return df.with_columns(Support=col("Support").forward_fill(), Resistance=col("Resistance").forward_fill())
+
+
+def timeit(fn) -> tuple[float, pl.DataFrame]:
+    """Durée d'un appel en millisecondes (meilleur de 3) et son résultat."""
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+if __name__ == "__main__":
+    builder = TechnicalChartBuilder()
+    print(f"{'bougies':>10}{'fenêtre':>9}{'avant (ms)':>12}{'après (ms)':>12}{'gain':>8}")
+
+    for n in LENGTHS:
+        df = synthetic_ohlcv(n, 5)
+        for window in WINDOWS:
+            before, expected = timeit(lambda: legacy_pivot_levels(df, window))
+            after, result = timeit(lambda: builder.add_pivot_levels(df, window))
+            assert result.equals(expected), f"résultats différents ({n} bougies, fenêtre {window})"
+            print(f"{n:>10}{window:>9}{before:>12.1f}{after:>12.1f}{before / after:>7.1f}x")
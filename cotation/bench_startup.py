@@ -0,0 +1,42 @@
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# Benchmark du démarrage à froid : import de appl puis construction de SiteWebLocal, dans un interpréteur neuf
+# (et un répertoire de travail vide, pour des bases SQLite neuves). Indique aussi les bibliothèques lourdes chargées.
+
+HEAVY_MODULES = ('matplotlib', 'mplfinance', 'plotly', 'binance', 'dateparser', 'aiohttp', 'requests', 'websockets')
+RUNS = 5
+
+STARTUP_CODE = f"""
+import json, sys, time
+start = time.perf_counter()
+import appl
+imported = time.perf_counter()
+site = appl.SiteWebLocal()
+built = time.perf_counter()
+print(json.dumps({{
+    'import': imported - start, 'construction': built - imported,
+    'loaded': [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure_startup(source_dir=Path(__file__).parent) -> dict:
+    """Mesure un démarrage dans un nouveau processus Python."""
+    with tempfile.TemporaryDirectory() as workdir:
+        result = subprocess.run(
+            [sys.executable, "-c", f"import sys; sys.path.insert(0, {str(source_dir)!r})\n{STARTUP_CODE}"],
+            cwd=workdir, capture_output=True, text=True, check=True,
+        )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    runs = [measure_startup() for _ in range(RUNS)]
+    print(f"import appl         : {statistics.median(r['import'] for r in runs) * 1000:.0f} ms (médiane sur {RUNS})")
+    print(f"SiteWebLocal()      : {statistics.median(r['construction'] for r in runs) * 1000:.0f} ms")
+    print(f"modules lourds      : {', '.join(runs[-1]['loaded']) or 'aucun'}")
@@ -0,0 +1,154 @@
+import gzip
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from info import CACHE_MAX_BYTES, CACHE_DB_PATH
+
+
+def candle_open_time(interval, now=None) -> int:
+    """Retourne l'heure d'ouverture (en secondes epoch) de la bougie en cours pour un intervalle Binance."""
+    from binance.helpers import interval_to_milliseconds
+
+    now = int(time.time() if now is None else now)
+    step = interval_to_milliseconds(interval) // 1000
+    # L'epoch tombe un jeudi alors que les bougies hebdomadaires Binance s'ouvrent le lundi
+    offset = 4 * 86400 if interval.endswith('w') else 0
+    return (now - offset) // step * step + offset
+
+
+def compress_payload(payload: bytes) -> bytes:
+    """Compresse un payload en gzip, une seule fois à la mise en cache (mtime fixe : même contenu, mêmes octets)."""
+    return gzip.compress(payload, compresslevel=6, mtime=0)
+
+
+def payload_etag(body: bytes) -> str:
+    """ETag d'un payload gzip, lu dans sa fin de fichier (CRC32 et taille du contenu) : rien à recalculer par requête."""
+    crc, size = struct.unpack('<II', body[-8:])
+    return f"{crc:08x}{size:08x}"
+
+
+class SharedCache:
+    """
+    Cache des réponses dans un fichier SQLite (mode WAL), partagé par les processus workers du serveur WSGI :
+    une réponse calculée par un worker est servie par tous les autres jusqu'à son expiration.
+    """
+    def __init__(self, db_path=CACHE_DB_PATH):
+        self.db_path = db_path
+        self.local = threading.local()
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, expires_at REAL NOT NULL, payload BLOB NOT NULL)")
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Connexion du thread courant (autocommit), ouverte au premier usage."""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA busy_timeout = 5000")
+            conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def get(self, key) -> tuple[float, bytes] | None:
+        """Retourne (expiration, payload) s'il n'a pas expiré."""
+        row = self.conn.execute("SELECT expires_at, payload FROM responses WHERE key = ? AND expires_at > ?",
+                                (repr(key), time.time())).fetchone()
+        return (row[0], bytes(row[1])) if row else None
+
+    def put(self, key, payload, expires_at) -> None:
+        """Enregistre un payload et purge les réponses expirées."""
+        try:
+            self.conn.execute("INSERT OR REPLACE INTO responses (key, expires_at, payload) VALUES (?, ?, ?)", (repr(key), expires_at, payload))
+            self.conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+        except sqlite3.Error as e:
+            # Le cache partagé n'est qu'une optimisation : la réponse reste servie depuis la mémoire
+            print(f"Cache partagé indisponible : {e}")
+
+
+class ResponseCache:
+    """
+    Cache LRU en mémoire des réponses sérialisées, borné en octets, avec expiration.
+    Les requêtes concurrentes sur une même clé ne déclenchent qu'un seul calcul.
+    Avec un cache partagé (SharedCache), les réponses absentes de la mémoire y sont cherchées avant d'être calculées.
+    """
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, shared: SharedCache | None = None):
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self.entries = OrderedDict()  # clé -> (expiration epoch, payload)
+        self.size = 0
+        self.lock = threading.Lock()
+        self.pending = {}  # clé -> threading.Event des calculs en cours
+
+    def get(self, key) -> bytes | None:
+        """Retourne le payload en cache s'il n'a pas expiré."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, payload, expires_at) -> None:
+        """Ajoute un payload et évince les entrées expirées puis les moins récemment utilisées."""
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            if len(payload) > self.max_bytes:
+                return
+            self.entries[key] = (expires_at, payload)
+            self.size += len(payload)
+
+            now = time.time()
+            for old_key in [k for k, (expires, _) in self.entries.items() if expires <= now]:
+                self._remove(old_key)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+
+    def get_or_compute(self, key, expires_at, compute) -> bytes | None:
+        """
+        Retourne le payload en cache ou le calcule via compute().
+        Un seul thread calcule, les autres attendent son résultat. Un résultat None n'est pas mis en cache.
+        """
+        while True:
+            payload = self.get(key)
+            if payload is not None:
+                return payload
+
+            with self.lock:
+                event = self.pending.get(key)
+                leader = event is None
+                if leader:
+                    event = self.pending[key] = threading.Event()
+
+            if not leader:
+                # Un autre thread calcule déjà cette réponse : on attend puis on relit le cache
+                event.wait()
+                continue
+
+            payload = None
+            try:
+                shared = self.shared.get(key) if self.shared is not None else None
+                if shared is not None:
+                    # Réponse déjà calculée par un autre worker
+                    expires_at, payload = shared
+                else:
+                    payload = compute()
+                    if payload is not None and self.shared is not None:
+                        self.shared.put(key, payload, expires_at)
+            finally:
+                if payload is not None:
+                    self.put(key, payload, expires_at)
+                with self.lock:
+                    del self.pending[key]
+                event.set()
+            return payload
+
+    def _remove(self, key) -> None:
+        """Retire une entrée (le verrou doit être tenu par l'appelant)."""
+        _, payload = self.entries.pop(key)
+        self.size -= len(payload)
@@ -0,0 +1,149 @@
+import io
+import threading
+
+import numpy as np
+import polars as pl
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter, MaxNLocator
+
+
+UP_COLOR, DOWN_COLOR = '#26a69a', '#ef5350'
+
+
+def _bars(x, bottom, top, width) -> np.ndarray:
+    """Sommets (n, 4, 2) de rectangles centrés sur x, de bottom à top."""
+    left, right = x - width / 2, x + width / 2
+    return np.stack([
+        np.column_stack([left, bottom]), np.column_stack([left, top]),
+        np.column_stack([right, top]), np.column_stack([right, bottom]),
+    ], axis=1)
+
+
+def _column(df, name) -> np.ndarray:
+    """Colonne en tableau NumPy float (NaN si la colonne est absente), sans passer par pandas."""
+    if name not in df.columns:
+        return np.full(df.height, np.nan)
+    return df.get_column(name).cast(pl.Float64).to_numpy()
+
+
+class ChartRenderer:
+    """
+    Moteur de rendu des graphiques des rapports : la figure matplotlib et ses artistes sont construits
+    une seule fois, chaque rendu ne fait que mettre à jour leurs données puis encode le PNG en mémoire.
+    Une instance n'est pas thread-safe : utiliser get_renderer() (une instance par thread).
+    """
+
+    def __init__(self, figsize=(12, 8), dpi=100):
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.fig)
+        grid = self.fig.add_gridspec(3, 1, height_ratios=(6, 2, 2), hspace=0.08)
+        self.ax_price = self.fig.add_subplot(grid[0])
+        self.ax_rsi = self.fig.add_subplot(grid[1], sharex=self.ax_price)
+        self.ax_macd = self.fig.add_subplot(grid[2], sharex=self.ax_price)
+        self.ax_volume = self.ax_price.twinx()
+        self.labels = np.array([], dtype=str)
+
+        # Panneau prix : volume en fond, mèches, corps, moyennes mobiles, supports / résistances
+        self.volume = PolyCollection([], facecolors='gray', alpha=0.3, linewidths=0)
+        self.ax_volume.add_collection(self.volume)
+        self.ax_volume.set_yticks([])
+        self.ax_price.set_zorder(self.ax_volume.get_zorder() + 1)
+        self.ax_price.patch.set_visible(False)
+        self.wicks = LineCollection([], linewidths=0.8)
+        self.bodies = PolyCollection([], linewidths=0.5)
+        self.levels = LineCollection([], linestyles='--', linewidths=0.8)
+        for artist in (self.levels, self.wicks, self.bodies):
+            self.ax_price.add_collection(artist)
+        self.ma_short, = self.ax_price.plot([], [], color='orange', linewidth=1)
+        self.ma_long, = self.ax_price.plot([], [], color='purple', linewidth=1)
+        self.ax_price.set_ylabel('Cours (USDC)')
+
+        # Panneau RSI
+        self.rsi, = self.ax_rsi.plot([], [], color='blue', linewidth=1)
+        for level, color in ((70, DOWN_COLOR), (30, UP_COLOR)):
+            self.ax_rsi.axhline(level, color=color, linestyle='--', linewidth=0.8, alpha=0.6)
+        self.ax_rsi.set_ylim(0, 100)
+        self.ax_rsi.set_ylabel('RSI')
+
+        # Panneau MACD
+        self.macd_hist = PolyCollection([], facecolors='gray', alpha=0.5, linewidths=0)
+        self.ax_macd.add_collection(self.macd_hist)
+        self.macd_line, = self.ax_macd.plot([], [], color='navy', linewidth=1)
+        self.macd_signal, = self.ax_macd.plot([], [], color='cyan', linewidth=1)
+        self.ax_macd.set_ylabel('MACD')
+
+        # Axe des x en index de bougie (pas de trous le week-end), étiqueté par les dates
+        for ax in (self.ax_price, self.ax_rsi):
+            ax.tick_params(labelbottom=False)
+        self.ax_macd.xaxis.set_major_locator(MaxNLocator(8, integer=True))
+        self.ax_macd.xaxis.set_major_formatter(FuncFormatter(self._format_date))
+        for ax in (self.ax_price, self.ax_rsi, self.ax_macd):
+            ax.grid(True, alpha=0.3)
+        self.title = self.fig.suptitle('')
+
+    def _format_date(self, value, _position) -> str:
+        index = int(round(value))
+        return self.labels[index] if 0 <= index < len(self.labels) else ''
+
+    def render(self, df_analyzed: pl.DataFrame, symbol: str, supports=(), resistances=()) -> bytes:
+        """Met à jour les artistes avec les données du DataFrame et retourne le PNG."""
+        n = df_analyzed.height
+        x = np.arange(n, dtype=float)
+        open_, high, low, close = (_column(df_analyzed, c) for c in ('Open', 'High', 'Low', 'Close'))
+        rising = close >= open_
+        colors = np.where(rising, UP_COLOR, DOWN_COLOR)
+        self.labels = df_analyzed.get_column('Open Time').dt.strftime('%d/%m %Hh').to_numpy()
+
+        # Bougies
+        self.wicks.set_segments(np.stack([np.column_stack([x, low]), np.column_stack([x, high])], axis=1))
+        self.wicks.set_colors(colors)
+        self.bodies.set_verts(_bars(x, np.minimum(open_, close), np.maximum(open_, close), 0.6))
+        self.bodies.set_facecolors(colors)
+        self.bodies.set_edgecolors(colors)
+        self.ma_short.set_data(x, _column(df_analyzed, 'MA_short'))
+        self.ma_long.set_data(x, _column(df_analyzed, 'MA_long'))
+
+        # Supports (verts) et résistances (rouges) sur toute la largeur
+        levels = list(supports) + list(resistances)
+        self.levels.set_segments([[(-1, level), (n, level)] for level in levels])
+        self.levels.set_colors(['g'] * len(supports) + ['r'] * len(resistances))
+
+        # Volume
+        volume = np.nan_to_num(_column(df_analyzed, 'Volume'))
+        self.volume.set_verts(_bars(x, np.zeros(n), volume, 0.8))
+        self.ax_volume.set_ylim(0, (volume.max() if n else 1) * 4 or 1)
+
+        # Oscillateurs
+        self.rsi.set_data(x, _column(df_analyzed, 'RSI_14'))
+        macd_line, macd_signal = _column(df_analyzed, 'MACD_line'), _column(df_analyzed, 'MACD_signal')
+        macd_hist = np.nan_to_num(_column(df_analyzed, 'MACD_hist'))
+        self.macd_line.set_data(x, macd_line)
+        self.macd_signal.set_data(x, macd_signal)
+        self.macd_hist.set_verts(_bars(x, np.zeros(n), macd_hist, 0.8))
+
+        # Échelles recalculées à la main (autoscale ne tient pas compte des collections mises à jour)
+        self.ax_price.set_xlim(-1, n)
+        price_low, price_high = np.nanmin(np.r_[low, levels]), np.nanmax(np.r_[high, levels])
+        margin = (price_high - price_low) * 0.05 or 1
+        self.ax_price.set_ylim(price_low - margin, price_high + margin)
+        macd_all = np.r_[macd_line, macd_signal, macd_hist]
+        macd_low, macd_high = np.nanmin(macd_all, initial=0), np.nanmax(macd_all, initial=0)
+        margin = (macd_high - macd_low) * 0.1 or 1
+        self.ax_macd.set_ylim(macd_low - margin, macd_high + margin)
+
+        self.title.set_text(f'Analyse Technique {symbol}')
+        buffer = io.BytesIO()
+        self.fig.savefig(buffer, format='png')
+        return buffer.getvalue()
+
+
+_local = threading.local()
+
+
+def get_renderer() -> ChartRenderer:
+    """Retourne le moteur de rendu du thread courant (construit au premier appel puis réutilisé)."""
+    if not hasattr(_local, 'renderer'):
+        _local.renderer = ChartRenderer()
+    return _local.renderer
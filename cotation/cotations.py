@@ -1,37 +1,186 @@
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import polars as pl
-from binance.client import Client
+
+from cache import candle_open_time
+
+
+# Champs d'une bougie brute Binance, dans l'ordre (prix et volumes transmis en texte)
+KLINE_SCHEMA = {
+    "Open Time": pl.Int64, "Open": pl.Float64, "High": pl.Float64, "Low": pl.Float64, "Close": pl.Float64,
+    "Volume": pl.Float64, "Close Time": pl.Int64, "Quote Volume": pl.Float64, "Trades": pl.Int64,
+    "Taker Buy Volume": pl.Float64, "Taker Buy Quote Volume": pl.Float64, "Ignore": pl.String,
+}
+KLINE_DROPPED = ["Close Time", "Ignore"]  # champs non conservés
+KLINE_EXTRA = ["Quote Volume", "Trades", "Taker Buy Volume", "Taker Buy Quote Volume"]  # champs au-delà de l'OHLCV
+
+
+def _klines_columns(df: pl.DataFrame) -> pl.DataFrame:
+    """Champs conservés, convertis dans leur type final, heure d'ouverture en datetime."""
+    return df.select(
+        pl.col(name).cast(dtype) for name, dtype in KLINE_SCHEMA.items() if name not in KLINE_DROPPED
+    ).with_columns(pl.col("Open Time").cast(pl.Datetime(time_unit="ms")))
+
+
+def klines_to_frame(klines: list) -> pl.DataFrame:
+    """
+    Bougies brutes (listes renvoyées par python-binance) -> DataFrame : un seul parcours des lignes par NumPy, qui
+    convertit chaque champ (textes compris) en float64, puis un cast par colonne vers son type final.
+    """
+    # Tableau rangé par colonnes : chaque champ est une vue contiguë reprise telle quelle par Polars, sans copie
+    # du bloc entier. Horodatages et nombres de trades (< 2**53) passent sans perte par float64 ; le champ 'Ignore'
+    # vaut toujours "0".
+    raw = np.array(klines, dtype=np.float64, order='F').reshape(-1, len(KLINE_SCHEMA), order='F')
+    return _klines_columns(pl.DataFrame({name: raw[:, i] for i, name in enumerate(KLINE_SCHEMA)}))
+
+
+def parse_klines(body: bytes) -> pl.DataFrame:
+    """
+    Réponse JSON brute d'une page de /api/v3/klines (1000 bougies au plus) -> DataFrame, décodée par le lecteur
+    JSON de Polars, quel que soit le formatage du corps (espaces, retours à la ligne...).
+    Le corps est décodé d'un bloc : les longues plages sont lues page par page, dès leur arrivée (backfill).
+    """
+    # Le tableau de bougies est enveloppé dans un objet pour être lu comme une seule colonne de listes,
+    # nombres et textes étant tous lus en texte puis convertis
+    df = pl.read_json(io.BytesIO(b'{"klines":' + body + b'}'), schema={"klines": pl.List(pl.List(pl.String))})
+    rows = df.get_column("klines").explode().drop_nulls()
+    return _klines_columns(pl.DataFrame({
+        name: rows.list.get(i) for i, name in enumerate(KLINE_SCHEMA) if name not in KLINE_DROPPED
+    }))
+
+
+def resample_ohlcv(df: pl.DataFrame, interval: str) -> pl.DataFrame:
+    """Agrège des bougies en bougies plus longues (intervalle Binance, ex. '4h', '1d', '1w'), alignées comme celles de Binance."""
+    return df.sort("Open Time").group_by_dynamic("Open Time", every=interval, closed="left", label="left").agg(
+        pl.col("Open").first(), pl.col("High").max(), pl.col("Low").min(),
+        pl.col("Close").last(), pl.col("Volume").sum(),
+        *[pl.col(name).sum() for name in KLINE_EXTRA if name in df.columns],
+    )
 
 
 class BinanceAPI:
     """Gère la communication avec l'API de Binance pour récupérer les données de marché"""
-    
-    def __init__(self) -> None:
-        self.client = Client()
+
+    RESAMPLE_CACHE_SIZE = 64
+
+    def __init__(self, store=None, client=None, base_interval=None, bulk_fetcher=None) -> None:
+        # Client injecté (tests) ou, par défaut, client partagé créé à la première requête
+        self._client = client
+        # Stockage local optionnel des bougies (voir store.KlineStore)
+        self.store = store
+        # Téléchargement parallèle optionnel des longues plages (voir backfill.BulkKlineFetcher)
+        self.bulk_fetcher = bulk_fetcher
+        # Intervalle de base optionnel : seul celui-ci est téléchargé, les intervalles multiples en sont agrégés localement
+        self.base_interval = base_interval
+        self.resampled = OrderedDict()  # (symbol, interval, début) -> (empreinte des bougies de base, résultat)
+        self.lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            # Import différé : python-binance (et dateparser) ne sont chargés qu'à la première requête
+            from exchange import get_client
+            self._client = get_client()
+        return self._client
 
     def get_historical_data(self, symbol, interval, start_date_str) -> pl.DataFrame | None:
         """Récupère les données OHLCV brutes depuis Binance."""
-        
+
+        if self.can_resample(interval):
+            return self.get_resampled_data(symbol, interval, start_date_str)
+
+        if self.store is not None:
+            return self.get_stored_data(symbol, interval, start_date_str)
+
         try:
-            klines = self.client.get_historical_klines(symbol, interval, start_date_str)
-            if not klines: return None
-
-            df = pl.DataFrame({
-                "Open Time": [r[0] for r in klines], "Open": [r[1] for r in klines],
-                "High": [r[2] for r in klines], "Low": [r[3] for r in klines],
-                "Close": [r[4] for r in klines], "Volume": [r[5] for r in klines]
-            })
-
-            # On se contente de convertir les types de données.
-            df = df.with_columns(
-                pl.col("Open Time").cast(pl.Datetime(time_unit="ms")),
-                pl.col("Open").cast(pl.Float64),
-                pl.col("High").cast(pl.Float64),
-                pl.col("Low").cast(pl.Float64),
-                pl.col("Close").cast(pl.Float64),
-                pl.col("Volume").cast(pl.Float64)
-            )
-            return df
-        
+            df = self.fetch_klines_range(symbol, interval, start_date_str)
+            return df if not df.is_empty() else None
+
         except Exception as e:
             print(f"Erreur lors de la récupération des données pour {symbol}: {e}")
             return None
+
+    def get_stored_data(self, symbol, interval, start_date_str) -> pl.DataFrame | None:
+        """
+        Complète le stockage local avec les seules bougies manquantes, puis lit la fenêtre demandée.
+        Un appel répété ne coûte plus qu'une petite requête REST et une lecture locale.
+        """
+        from binance.helpers import convert_ts_str
+
+        start_ms = convert_ts_str(start_date_str)
+        covered_from, last_open_time = self.store.get_bounds(symbol, interval)
+
+        try:
+            if covered_from is None or last_open_time is None:
+                # Rien en stock : premier téléchargement complet de la fenêtre
+                klines = self.fetch_klines_range(symbol, interval, start_ms)
+                self.store.upsert_klines(symbol, interval, klines, start_time=start_ms)
+            else:
+                # Début de fenêtre jamais téléchargé : on comble le trou avant les données stockées
+                if start_ms < covered_from:
+                    klines = self.fetch_klines_range(symbol, interval, start_ms, covered_from - 1)
+                    self.store.upsert_klines(symbol, interval, klines, start_time=start_ms)
+
+                # Fin de fenêtre : on repart de la dernière bougie stockée (éventuellement encore en cours)
+                klines = self.fetch_klines_since(symbol, interval, last_open_time)
+                self.store.upsert_klines(symbol, interval, klines)
+
+        except Exception as e:
+            # Binance injoignable : on sert ce qui est déjà stocké
+            print(f"Erreur lors de la mise à jour des données pour {symbol}: {e}")
+
+        return self.store.get_klines(symbol, interval, start_ms)
+
+    def can_resample(self, interval) -> bool:
+        """Vrai si l'intervalle est un multiple de l'intervalle de base, aligné de la même façon que chez Binance."""
+        if self.base_interval is None or interval in (self.base_interval, '3d', '1M'):
+            return False
+        from binance.helpers import interval_to_milliseconds
+
+        base_ms, interval_ms = interval_to_milliseconds(self.base_interval), interval_to_milliseconds(interval)
+        return base_ms is not None and interval_ms is not None and interval_ms > base_ms and interval_ms % base_ms == 0
+
+    def get_resampled_data(self, symbol, interval, start_date_str) -> pl.DataFrame | None:
+        """Déduit les bougies de l'intervalle demandé des bougies de base, en réutilisant l'agrégat si elles n'ont pas changé."""
+        from binance.helpers import convert_ts_str
+
+        # Début ramené à l'ouverture de la bougie longue : la première bougie agrégée est complète
+        start_ms = candle_open_time(interval, convert_ts_str(start_date_str) // 1000) * 1000
+        df_base = self.get_historical_data(symbol, self.base_interval, start_ms)
+        if df_base is None or df_base.is_empty():
+            return None
+
+        key = (symbol, interval, start_ms)
+        fingerprint = (df_base.height, df_base.row(-1))
+        with self.lock:
+            cached = self.resampled.get(key)
+            if cached is not None and cached[0] == fingerprint:
+                self.resampled.move_to_end(key)
+                return cached[1]
+
+        df = resample_ohlcv(df_base, interval)
+        with self.lock:
+            self.resampled[key] = (fingerprint, df)
+            self.resampled.move_to_end(key)
+            while len(self.resampled) > self.RESAMPLE_CACHE_SIZE:
+                self.resampled.popitem(last=False)
+        return df
+
+    def fetch_klines_since(self, symbol, interval, start_ms) -> pl.DataFrame:
+        """Télécharge les bougies depuis start_ms : une seule requête si l'écart tient en une page."""
+        from binance.helpers import convert_ts_str, interval_to_milliseconds
+
+        limit = 1000
+        missing = (convert_ts_str("now UTC") - start_ms) // interval_to_milliseconds(interval) + 1
+        if missing <= limit:
+            return klines_to_frame(self.client.get_klines(symbol=symbol, interval=interval, startTime=start_ms, limit=limit))
+        return self.fetch_klines_range(symbol, interval, start_ms)
+
+    def fetch_klines_range(self, symbol, interval, start, end=None) -> pl.DataFrame:
+        """Télécharge une plage de bougies : pages en parallèle si un bulk_fetcher est configuré, sinon pagination du client."""
+        if self.bulk_fetcher is not None:
+            return self.bulk_fetcher.fetch(symbol, interval, start, end)
+        return klines_to_frame(self.client.get_historical_klines(symbol, interval, start, end, limit=1000))
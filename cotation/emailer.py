@@ -1,5 +1,7 @@
 import os
 import smtplib
+import threading
+import time
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.image import MIMEImage
@@ -8,12 +10,94 @@ from email.utils import make_msgid
 class SimpleEmailer:
     """ Classe pour envoyer des emails avec des rapports en HTML. """
     
-    def __init__(self, smtp_server='smtp.gmail.com', smtp_port=465, user=None, password=None) -> None:
-        """ Initialise le client email avec les paramètres SMTP et les identifiants de l'utilisateur."""
+    def __init__(self, smtp_server='smtp.gmail.com', smtp_port=465, user=None, password=None,
+                 use_ssl=True, max_per_minute=None, timeout=30) -> None:
+        """ Initialise le client email avec les paramètres SMTP et les identifiants de l'utilisateur.
+            max_per_minute limite optionnellement le débit d'envoi (ex: quotas Gmail).
+        """
         self.smtp_server = smtp_server
         self.smtp_port = smtp_port
         self.user = user or os.environ.get('GMAIL_USER')
         self.password = password or os.environ.get('GMAIL_APP_PASS')
+        self.use_ssl = use_ssl
+        self.max_per_minute = max_per_minute
+        self.timeout = timeout
+
+        # Connexion persistante (mode session) partagée entre les threads d'envoi
+        self.keep_alive = False
+        self.connection = None
+        self.lock = threading.Lock()
+        # Créneaux d'envoi (max_per_minute) réservés sous un verrou à part : l'attente se fait hors des verrous
+        self.throttle_lock = threading.Lock()
+        self.last_sent_at = 0.0
+
+    def open(self) -> 'SimpleEmailer':
+        """ Passe en mode session : une seule connexion authentifiée est gardée ouverte pour tous les envois. """
+        self.keep_alive = True
+        return self
+
+    def close(self) -> None:
+        """ Ferme la connexion persistante et quitte le mode session. """
+        with self.lock:
+            self.keep_alive = False
+            self._disconnect()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _connect(self) -> smtplib.SMTP:
+        """ Ouvre une connexion SMTP (TLS implicite par défaut) et s'authentifie. """
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        if self.password:
+            smtp.login(self.user, self.password)
+        return smtp
+
+    def _disconnect(self) -> None:
+        """ Ferme la connexion persistante si elle existe (le verrou doit être tenu). """
+        if self.connection is not None:
+            try:
+                self.connection.quit()
+            except OSError:  # inclut smtplib.SMTPException
+                pass
+            self.connection = None
+
+    def _throttle(self) -> None:
+        """ Espace les envois pour respecter max_per_minute : réserve le prochain créneau, puis l'attend sans verrou. """
+        with self.throttle_lock:
+            now = time.monotonic()
+            slot = max(now, self.last_sent_at + 60 / self.max_per_minute) if self.max_per_minute else now
+            self.last_sent_at = slot
+        if slot > now:
+            time.sleep(slot - now)
+
+    def send_message(self, msg) -> None:
+        """ Envoie un message, via la connexion persistante en mode session, avec une reconnexion en cas de coupure. """
+        self._throttle()
+        if not self.keep_alive:
+            # Une connexion par message : les envois de plusieurs threads se font en parallèle
+            with self._connect() as smtp:
+                smtp.send_message(msg)
+            return
+
+        # Connexion partagée : un seul envoi à la fois, mais l'attente du créneau suivant se fait pendant celui-ci
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    if self.connection is None:
+                        self.connection = self._connect()
+                    self.connection.send_message(msg)
+                    return
+                except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+                    # Connexion fermée par le serveur (inactivité, limite...) : on reconnecte une fois
+                    self.connection = None
+                    if attempt:
+                        raise
         
     def build_report_html(self, symbol, stats_30d, stats_7d)-> str:
         """ Génère le corps HTML du rapport avec les statistiques et les graphiques."""
@@ -53,8 +137,8 @@ class SimpleEmailer:
         """
         return html_body
 
-    def send_html_with_images(self, to, subject, html_body, image_paths) -> None:
-        """ Envoie un email HTML avec des images attachées. """
+    def send_html_with_images(self, to, subject, html_body, images) -> None:
+        """ Envoie un email HTML avec des images attachées (contenu PNG en bytes, ou chemins de fichiers). """
         
         msg = MIMEMultipart('related')
         msg['Subject'] = subject
@@ -62,19 +146,19 @@ class SimpleEmailer:
         msg['To'] = to
 
         # Génère un Content-ID unique pour chaque image et remplace dans le HTML
-        cids = [make_msgid()[1:-1] for _ in image_paths]
+        cids = [make_msgid()[1:-1] for _ in images]
         for i, cid in enumerate(cids):
             html_body = html_body.replace(f'{{img{i}}}', f'cid:{cid}')
         msg.attach(MIMEText(html_body, "html"))
 
         # Ajoute les images
-        for i, (img_path, cid) in enumerate(zip(image_paths, cids)):
-            with open(img_path, 'rb') as fp:
-                img = MIMEImage(fp.read())
-                img.add_header('Content-ID', f'<{cid}>')
-                msg.attach(img)
+        for image, cid in zip(images, cids):
+            if not isinstance(image, (bytes, bytearray, memoryview)):
+                with open(image, 'rb') as fp:
+                    image = fp.read()
+            img = MIMEImage(bytes(image))
+            img.add_header('Content-ID', f'<{cid}>')
+            msg.attach(img)
 
         # Envoi
-        with smtplib.SMTP_SSL(self.smtp_server, self.smtp_port) as smtp:
-            smtp.login(self.user, self.password)
-            smtp.send_message(msg)
\ No newline at end of file
+        self.send_message(msg)
\ No newline at end of file
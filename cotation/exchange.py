@@ -0,0 +1,30 @@
+import threading
+
+from binance.client import BaseClient, Client
+from requests.adapters import HTTPAdapter
+
+from info import BINANCE_POOL_SIZE, BINANCE_TIMEOUT
+
+
+class PooledClient(Client):
+    """
+    Client Binance sans appel réseau à la construction (pas de ping), sur une session HTTP dont les connexions
+    (TLS, keep-alive) sont gardées dans un pool partagé par tous les threads.
+    """
+    def __init__(self, pool_size=BINANCE_POOL_SIZE, timeout=BINANCE_TIMEOUT):
+        BaseClient.__init__(self, requests_params={'timeout': timeout})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> PooledClient:
+    """Retourne le client Binance partagé par toute l'application, construit au premier appel."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = PooledClient()
+        return _client
@@ -0,0 +1,13 @@
+from info import WSGI_WORKERS, WSGI_THREADS
+
+# Configuration gunicorn du mode production : gunicorn -c gunicorn.conf.py wsgi:app
+bind = '0.0.0.0:5000'
+workers = WSGI_WORKERS
+# Threads par worker : les requêtes lentes (téléchargement Binance) et les flux en direct (/api/stream,
+# une connexion ouverte par page) n'occupent qu'un thread chacun. Un flux garde son thread tant que la page est
+# ouverte : LIVE_MAX_CLIENTS (info.py) en limite le nombre par worker, les suivants reçoivent une réponse 503
+worker_class = 'gthread'
+threads = WSGI_THREADS
+timeout = 120
+# Pas de preload : chaque worker ouvre ses propres connexions SQLite, HTTP et WebSocket après le fork
+preload_app = False
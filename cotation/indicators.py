@@ -0,0 +1,107 @@
+import math
+from collections import deque
+
+from info import PERIOD_SHORT, PERIOD_LONG
+
+
+class RollingMean:
+    """Moyenne mobile sur 'window' valeurs tenue par somme glissante (équivalent de rolling_mean(min_periods=1))."""
+
+    def __init__(self, window):
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+
+    def update(self, x) -> float:
+        if len(self.values) == self.values.maxlen:
+            self.total -= self.values[0]
+        self.values.append(x)
+        self.total += x
+        return self.total / len(self.values)
+
+    def replace(self, x) -> float:
+        """Remplace la dernière valeur (bougie en cours mise à jour)."""
+        self.total += x - self.values[-1]
+        self.values[-1] = x
+        return self.total / len(self.values)
+
+
+class Ema:
+    """Moyenne mobile exponentielle récursive (équivalent de ewm_mean(adjust=False)) : y = (1 - alpha) * y_prec + alpha * x."""
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.previous = None  # valeur avant la dernière mise à jour, pour pouvoir la remplacer
+        self.value = None
+
+    def _next(self, x) -> float:
+        return x if self.previous is None else (1 - self.alpha) * self.previous + self.alpha * x
+
+    def update(self, x) -> float:
+        self.previous = self.value
+        self.value = self._next(x)
+        return self.value
+
+    def replace(self, x) -> float:
+        self.value = self._next(x)
+        return self.value
+
+
+class IndicatorEngine:
+    """
+    Indicateurs de TechnicalChartBuilder (MA_short, MA_long, MACD, RSI_14) tenus à jour bougie par bougie, en O(1),
+    avec les mêmes résultats que add_moving_averages et add_oscillators recalculés sur tout l'historique.
+    push() ajoute une bougie, replace_last() met à jour la bougie en cours.
+    """
+
+    def __init__(self, short_window=PERIOD_SHORT, long_window=PERIOD_LONG, fast_period=12, slow_period=26, signal_period=9, rsi_length=14):
+        self.ma_short = RollingMean(short_window)
+        self.ma_long = RollingMean(long_window)
+        self.ema_fast = Ema(2 / (fast_period + 1))
+        self.ema_slow = Ema(2 / (slow_period + 1))
+        self.macd_signal = Ema(2 / (signal_period + 1))
+        self.avg_gain = Ema(1 / rsi_length)
+        self.avg_loss = Ema(1 / rsi_length)
+        self.previous_close = None  # clôture de l'avant-dernière bougie (base du RSI de la dernière)
+        self.last_close = None
+        self.last = {}
+
+    def push(self, close) -> dict:
+        """Intègre une nouvelle bougie et retourne ses indicateurs."""
+        self.previous_close, self.last_close = self.last_close, close
+        return self._compute(close, 'update')
+
+    def replace_last(self, close) -> dict:
+        """Recalcule les indicateurs de la dernière bougie avec une nouvelle clôture."""
+        if self.last_close is None:
+            return self.push(close)
+        self.last_close = close
+        return self._compute(close, 'replace')
+
+    def extend(self, closes) -> dict:
+        """Intègre une série de clôtures (initialisation depuis l'historique) et retourne les indicateurs de la dernière."""
+        for close in closes:
+            self.push(close)
+        return self.last
+
+    def _compute(self, close, method) -> dict:
+        step = lambda indicator, x: getattr(indicator, method)(x)
+
+        macd_line = step(self.ema_fast, close) - step(self.ema_slow, close)
+        macd_signal = step(self.macd_signal, macd_line)
+
+        # Première bougie : pas de variation, gains et pertes à 0 (comme diff() nul puis otherwise(0))
+        price_diff = close - self.previous_close if self.previous_close is not None else 0.0
+        avg_gain = step(self.avg_gain, max(price_diff, 0.0))
+        avg_loss = step(self.avg_loss, max(-price_diff, 0.0))
+        if avg_loss == 0:
+            # Mêmes valeurs que la division Polars : 0/0 -> NaN, x/0 -> inf donc RSI à 100
+            rsi = math.nan if avg_gain == 0 else 100.0
+        else:
+            rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+
+        self.last = {
+            'MA_short': step(self.ma_short, close), 'MA_long': step(self.ma_long, close),
+            'MACD_line': macd_line, 'MACD_signal': macd_signal, 'MACD_hist': macd_line - macd_signal,
+            'RSI_14': rsi,
+        }
+        return self.last
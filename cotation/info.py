@@ -2,8 +2,42 @@ TIME_SCHEDULER = "23:52"  # Heure de lancement des tâches planifiées
 PERIOD_SHORT = 7  # Période courte pour les moyennes mobiles
 PERIOD_LONG = 20  # Période longue pour les moyennes mobiles
 PERIOD_SUPPORT = 30  # Période pour les niveaux de support/résistance
+LEVELS_MAX = 5  # Nombre maximal de supports (et de résistances) tracés sur les graphiques
+LEVELS_ATR_MULTIPLE = 0.5  # Distance (en ATR 14) en dessous de laquelle deux niveaux de pivot sont regroupés
 CRYPTOS = {
             'BTCUSDC': 'Bitcoin (BTC/USDC)', 'ETHUSDC': 'Ethereum (ETH/USDC)',
             'SOLUSDC': 'Solana (SOL/USDC)', 'XRPUSDC': 'Ripple (XRP/USDC)',
             'ADAUSDC': 'Cardano (ADA/USDC)',
-        }
\ No newline at end of file
+        }
+# Profondeurs du dashboard : (nombre de jours d'historique, intervalle des bougies)
+PROFONDEURS = {
+            '1j': (1, '5m'), '1s': (7, '1h'), '1m': (30, '4h'),
+            '1a': (365, '1d'), '5a': (365 * 5, '1w'),
+        }
+# Intervalle de base téléchargé et stocké : les intervalles multiples (4h, 1d, 1w) en sont agrégés localement
+BASE_INTERVAL = '1h'
+BINANCE_POOL_SIZE = 8  # Connexions HTTP gardées ouvertes vers l'API Binance (Flask, scheduler, téléchargements)
+BINANCE_TIMEOUT = (5, 15)  # Délais de connexion et de lecture des requêtes Binance (secondes)
+BACKFILL_WORKERS = 4  # Téléchargements simultanés des longues plages de bougies
+BINANCE_WEIGHT_PER_MINUTE = 6000  # Poids de requêtes autorisé par minute et par IP sur l'API Binance
+CACHE_MAX_BYTES = 32 * 1024 * 1024  # Taille maximale du cache des réponses du dashboard
+# Concurrence maximale de chaque étape des rapports : téléchargement/analyse, rendu (processus), envoi SMTP
+# 'batch' coordonne un rapport par crypto et attend surtout les autres étapes. 'send' : la connexion SMTP de session
+# n'envoie qu'un message à la fois, le second thread prépare le message suivant et attend son créneau pendant l'envoi
+REPORT_WORKERS = {'batch': 8, 'fetch': 4, 'render': 2, 'send': 2}
+EMAIL_MAX_PER_MINUTE = 20  # Débit maximal d'envoi des rapports par e-mail (quotas Gmail)
+LIVE_MAX_CANDLES = 2000  # Nombre maximal de bougies gardées en mémoire par flux en direct
+SYSTEM_SAMPLE_INTERVAL = 2  # Période (secondes) des relevés système de la page de monitoring
+SYSTEM_HISTORY_SIZE = 150  # Relevés système gardés en mémoire (5 minutes à 2s), pour les mini-graphiques
+SCHEDULER_MAX_SLEEP = 3600  # Sommeil maximal (secondes) de la boucle du scheduler entre deux vérifications de l'horloge
+# Mode production (gunicorn -c gunicorn.conf.py wsgi:app) : processus workers et threads par worker (Pi 4 coeurs)
+WSGI_WORKERS = 4
+WSGI_THREADS = 8
+# Flux en direct (/api/stream) ouverts au plus par worker : chacun garde un thread jusqu'à la fermeture de la page,
+# la moitié des threads reste ainsi libre pour les autres requêtes (au-delà : réponse 503)
+LIVE_MAX_CLIENTS = WSGI_THREADS // 2
+CACHE_DB_PATH = 'cache.db'  # Cache des réponses partagé par les workers
+SCHEDULER_LOCK_PATH = 'scheduler.lock'  # Verrou du worker qui fait tourner le scheduler
+SCHEDULER_SYNC_INTERVAL = 30  # Période (secondes) de relecture des tâches modifiées par les autres workers
+WARMER_DELAY = 5  # Délai (secondes) après la clôture d'une bougie avant de précalculer les vues du dashboard
+JOBSTORE_POOL_SIZE = 4  # Connexions SQLite ouvertes au plus sur la base des tâches planifiées
@@ -0,0 +1,216 @@
+import json
+import math
+import queue
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+
+import polars as pl
+
+from indicators import IndicatorEngine
+from info import LIVE_MAX_CANDLES
+
+
+class KlineFeed(ABC):
+    """
+    Source de bougies en direct. Le callback reçoit les bougies au format 'k' des flux kline Binance :
+    {'t': ouverture (ms), 'o', 'h', 'l', 'c', 'v' (chaînes), 'x': bougie clôturée}.
+    """
+    @abstractmethod
+    def subscribe(self, symbol, interval, callback) -> None:
+        """Ouvre le flux (symbol, interval) et appelle callback à chaque bougie reçue."""
+
+    @abstractmethod
+    def unsubscribe(self, symbol, interval) -> None:
+        """Ferme le flux (symbol, interval)."""
+
+
+class BinanceKlineFeed(KlineFeed):
+    """Flux kline Binance par WebSocket, un thread par (symbol, interval), avec reconnexion automatique."""
+
+    STREAM_URL = 'wss://stream.binance.com:9443/ws/{symbol}@kline_{interval}'
+
+    def __init__(self):
+        self.stops = {}
+
+    def subscribe(self, symbol, interval, callback) -> None:
+        stop = self.stops[(symbol, interval)] = threading.Event()
+        url = self.STREAM_URL.format(symbol=symbol.lower(), interval=interval)
+        threading.Thread(target=self._run, args=(url, callback, stop), daemon=True, name=f"kline-{symbol}-{interval}").start()
+
+    def unsubscribe(self, symbol, interval) -> None:
+        stop = self.stops.pop((symbol, interval), None)
+        if stop:
+            stop.set()
+
+    def _run(self, url, callback, stop) -> None:
+        from websockets.sync.client import connect
+
+        retry_delay = 1
+        while not stop.is_set():
+            try:
+                with connect(url, open_timeout=10) as ws:
+                    retry_delay = 1
+                    while not stop.is_set():
+                        try:
+                            message = json.loads(ws.recv(timeout=5))
+                        except TimeoutError:
+                            continue
+                        if message.get('e') == 'kline':
+                            callback(message['k'])
+            except Exception as e:
+                print(f"Flux kline interrompu ({url}) : {e}, reconnexion dans {retry_delay}s")
+                stop.wait(retry_delay)
+                retry_delay = min(retry_delay * 2, 60)
+
+
+class ReplayKlineFeed(KlineFeed):
+    """Rejoue une liste de bougies au format 'k' (tests, démonstrations hors ligne)."""
+
+    def __init__(self, klines, delay=0.0):
+        self.klines = klines
+        self.delay = delay
+        self.stops = {}
+
+    def subscribe(self, symbol, interval, callback) -> None:
+        stop = self.stops[(symbol, interval)] = threading.Event()
+
+        def replay():
+            for kline in self.klines:
+                if stop.wait(self.delay):
+                    return
+                callback(kline)
+
+        threading.Thread(target=replay, daemon=True).start()
+
+    def unsubscribe(self, symbol, interval) -> None:
+        stop = self.stops.pop((symbol, interval), None)
+        if stop:
+            stop.set()
+
+
+class LiveStream:
+    """Dernières bougies d'un (symbol, interval) tenues à jour en mémoire, diffusées aux clients abonnés."""
+
+    def __init__(self, df_history: pl.DataFrame, chart_builder):
+        self.df = df_history.select("Open Time", "Open", "High", "Low", "Close", "Volume")
+        self.chart_builder = chart_builder
+        self.engine = IndicatorEngine()
+        self.engine.extend(self.df.get_column("Close"))
+        self.lock = threading.Lock()
+        self.listeners = set()
+
+    def listen(self) -> queue.Queue:
+        """Retourne une file qui recevra chaque mise à jour sérialisée en JSON."""
+        listener = queue.Queue(maxsize=100)
+        with self.lock:
+            self.listeners.add(listener)
+        return listener
+
+    def unlisten(self, listener) -> int | None:
+        """Désabonne une file et retourne le nombre d'abonnés restants (None si elle était déjà désabonnée)."""
+        with self.lock:
+            if listener not in self.listeners:
+                return None
+            self.listeners.remove(listener)
+            return len(self.listeners)
+
+    def on_kline(self, kline) -> None:
+        """Intègre une bougie du flux (mise à jour de la bougie en cours ou nouvelle bougie) et diffuse le résultat."""
+        row = pl.DataFrame({
+            "Open Time": [kline['t']], "Open": [float(kline['o'])], "High": [float(kline['h'])],
+            "Low": [float(kline['l'])], "Close": [float(kline['c'])], "Volume": [float(kline['v'])],
+        }).with_columns(pl.col("Open Time").cast(pl.Datetime(time_unit="ms")))
+
+        with self.lock:
+            open_time = row.item(0, "Open Time")
+            last_open_time = self.df.item(-1, "Open Time") if not self.df.is_empty() else None
+            if last_open_time is not None and open_time < last_open_time:
+                return
+            # Indicateurs mis à jour en O(1) par l'état incrémental, sans recalcul sur tout l'historique
+            if open_time == last_open_time:
+                self.df = pl.concat([self.df.slice(0, self.df.height - 1), row])
+                self.engine.replace_last(row.item(0, "Close"))
+            else:
+                self.df = pl.concat([self.df, row]).tail(LIVE_MAX_CANDLES)
+                self.engine.push(row.item(0, "Close"))
+
+            update = self.last_candle_update()
+            update['closed'] = bool(kline.get('x', False))
+            payload = json.dumps(update)
+            for listener in self.listeners:
+                try:
+                    listener.put_nowait(payload)
+                except queue.Full:
+                    # Client trop lent : on jette la plus ancienne mise à jour
+                    listener.get_nowait()
+                    listener.put_nowait(payload)
+
+    def last_candle_update(self) -> dict:
+        """Dernière bougie et ses indicateurs, avec les statistiques de la fenêtre (le verrou doit être tenu)."""
+        last = dict(self.df.row(-1, named=True), **self.engine.last)
+        # NaN (RSI sur prix plats...) -> null, pour rester du JSON valide côté navigateur
+        last = {k: None if isinstance(v, float) and math.isnan(v) else v for k, v in last.items()}
+        summary = pl.DataFrame({'Open': [self.df.item(0, 'Open')], 'Close': [last['Close']], 'RSI_14': [last['RSI_14']]})
+        return {
+            'x': last['Open Time'].strftime('%Y-%m-%dT%H:%M:%S'),
+            'open': last['Open'], 'high': last['High'], 'low': last['Low'], 'close': last['Close'],
+            'volume': last['Volume'], 'ma_short': last['MA_short'], 'ma_long': last['MA_long'],
+            'rsi': last['RSI_14'], 'macd': last['MACD_line'], 'macd_signal': last['MACD_signal'],
+            'macd_hist': last['MACD_hist'],
+            'summary_stats': self.chart_builder.add_summary_stats(summary),
+        }
+
+
+class LiveMarket:
+    """Gère un flux en direct par (symbol, interval) surveillé, ouvert au premier abonné et fermé au dernier."""
+
+    def __init__(self, feed: KlineFeed, binance_api, chart_builder):
+        self.feed = feed
+        self.binance_api = binance_api
+        self.chart_builder = chart_builder
+        self.streams = {}
+        self.lock = threading.Lock()
+
+    def listen(self, symbol, interval, days) -> tuple[LiveStream, queue.Queue] | None:
+        """Abonne un client au flux (symbol, interval), initialisé avec l'historique des 'days' derniers jours."""
+        with self.lock:
+            stream = self.streams.get((symbol, interval))
+            if stream is not None:
+                return stream, stream.listen()
+
+        # Téléchargement de l'historique hors verrou : les abonnements aux autres flux ne l'attendent pas
+        start_date = datetime.now() - timedelta(days=days)
+        df_history = self.binance_api.get_historical_data(symbol, interval, str(start_date))
+        if df_history is None or df_history.is_empty():
+            return None
+        new_stream = LiveStream(df_history, self.chart_builder)
+
+        with self.lock:
+            stream = self.streams.get((symbol, interval))
+            if stream is not None:
+                # Flux ouvert entre-temps par un autre client : on s'y abonne
+                return stream, stream.listen()
+            stream = self.streams[(symbol, interval)] = new_stream
+            # Abonné inscrit avant l'ouverture du flux : aucune mise à jour perdue
+            listener = stream.listen()
+            self.feed.subscribe(symbol, interval, stream.on_kline)
+            return stream, listener
+
+    def unlisten(self, symbol, interval, stream, listener) -> None:
+        """Désabonne un client et ferme le flux s'il n'a plus d'abonnés (sans effet si le client est déjà désabonné)."""
+        with self.lock:
+            if stream.unlisten(listener) == 0 and self.streams.get((symbol, interval)) is stream:
+                del self.streams[(symbol, interval)]
+                self.feed.unsubscribe(symbol, interval)
+
+    def events(self, symbol, interval, stream, listener, keep_alive=15):
+        """Générateur Server-Sent Events des mises à jour d'un flux, jusqu'à la déconnexion du client."""
+        try:
+            while True:
+                try:
+                    yield f"data: {listener.get(timeout=keep_alive)}\n\n"
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+        finally:
+            self.unlisten(symbol, interval, stream, listener)
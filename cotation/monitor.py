@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import deque
+
+import psutil
+
+from info import SYSTEM_SAMPLE_INTERVAL, SYSTEM_HISTORY_SIZE
+
+
+def read_system_stats() -> dict:
+    """
+    Relevé instantané CPU (global et par cœur), température, RAM et disque.
+    L'usage CPU est celui mesuré depuis le relevé précédent : les relevés doivent venir d'un seul appelant.
+    """
+    # Température CPU : la clé peut varier, on cherche celle du CPU du Pi
+    temps = psutil.sensors_temperatures() if hasattr(psutil, 'sensors_temperatures') else {}
+    cpu_temp = 0.0
+    if 'cpu_thermal' in temps:
+        cpu_temp = temps['cpu_thermal'][0].current
+    elif 'coretemp' in temps:  # Pour d'autres systèmes Linux
+        cpu_temp = temps['coretemp'][0].current
+
+    ram = psutil.virtual_memory()
+    disk = psutil.disk_usage('/')  # partition racine
+    return {
+        'time': round(time.time(), 1),
+        'cpu_usage': psutil.cpu_percent(interval=None),
+        'cpu_cores_usage': psutil.cpu_percent(interval=None, percpu=True),
+        'cpu_temp': round(cpu_temp, 1),
+        'ram': {'total': round(ram.total / 1024**3, 2), 'used': round(ram.used / 1024**3, 2), 'percent': ram.percent},
+        'disk': {'total': round(disk.total / 1024**3, 2), 'used': round(disk.used / 1024**3, 2), 'percent': disk.percent},
+    }
+
+
+class SystemSampler:
+    """
+    Relevés système pris en tâche de fond toutes les 'interval' secondes et gardés dans un tampon circulaire :
+    les requêtes lisent le dernier relevé sans attendre, quel que soit le nombre de pages de monitoring ouvertes.
+    """
+
+    def __init__(self, interval=SYSTEM_SAMPLE_INTERVAL, size=SYSTEM_HISTORY_SIZE, probe=read_system_stats):
+        self.interval = interval
+        self.probe = probe
+        self.samples = deque(maxlen=size)
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self) -> None:
+        """Lance le thread de relevés (sans effet s'il tourne déjà)."""
+        with self.lock:
+            if self.thread is not None:
+                return
+            # Premier appel : initialise la mesure CPU, le relevé suivant couvrira un intervalle complet
+            self.samples.append(self.probe())
+            self.thread = threading.Thread(target=self._run, daemon=True, name="system-sampler")
+            self.thread.start()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def _run(self) -> None:
+        while not self.stop_event.wait(self.interval):
+            try:
+                sample = self.probe()
+            except Exception as e:
+                print(f"Relevé système impossible : {e}")
+                continue
+            with self.lock:
+                self.samples.append(sample)
+
+    def latest(self) -> dict:
+        """Dernier relevé (le thread est lancé au premier appel si besoin)."""
+        self.start()
+        with self.lock:
+            return self.samples[-1]
+
+    def history(self, count) -> dict:
+        """Séries des 'count' derniers relevés (heure, CPU, température, RAM, disque), pour les mini-graphiques."""
+        with self.lock:
+            samples = list(self.samples)[-count:] if count > 0 else []
+        return {
+            'time': [s['time'] for s in samples],
+            'cpu_usage': [s['cpu_usage'] for s in samples],
+            'cpu_temp': [s['cpu_temp'] for s in samples],
+            'ram_percent': [s['ram']['percent'] for s in samples],
+            'disk_percent': [s['disk']['percent'] for s in samples],
+        }
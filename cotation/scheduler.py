@@ -1,68 +1,331 @@
+import heapq
+import itertools
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from info import TIME_SCHEDULER, SCHEDULER_MAX_SLEEP, JOBSTORE_POOL_SIZE
+
+
+FREQUENCIES = ('daily', 'weekly', 'monthly')  # Fréquences d'envoi proposées par la page de planification
+
+
+def due_frequencies(day: datetime) -> list[str]:
+    """Retourne les fréquences d'envoi dues pour un jour donné (hebdomadaire le dimanche, mensuel le 1er)."""
+    frequencies = ['daily']
+    if day.weekday() == 6:
+        frequencies.append('weekly')
+    if day.day == 1:
+        frequencies.append('monthly')
+    return frequencies
+
+
+def next_run_time(frequency: str, after: datetime, at: str = TIME_SCHEDULER) -> datetime:
+    """Prochaine heure d'envoi ('at', heure locale HH:MM) strictement après 'after', un jour où la fréquence est due.
+       Lève ValueError pour une fréquence inconnue.
+    """
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"Fréquence d'envoi inconnue : {frequency!r}")
+    hour, minute = map(int, at.split(':'))
+    day = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if day <= after:
+        day += timedelta(days=1)
+    while frequency not in due_frequencies(day):
+        day += timedelta(days=1)
+    return day
+
+
+def _to_db(moment: datetime) -> str:
+    """Heure au format texte stocké en BDD (l'ordre alphabétique suit l'ordre chronologique)."""
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+class TaskScheduler:
+    """
+    Ordonnanceur à tas (min-heap) des prochaines exécutions, repérées par une clé (job_id...).
+    La boucle dort jusqu'à l'échéance la plus proche et est réveillée par la condition quand une tâche est
+    ajoutée ou annulée. Une échéance déjà passée (tâche manquée pendant un arrêt) est exécutée aussitôt.
+    """
+
+    def __init__(self, max_sleep=SCHEDULER_MAX_SLEEP):
+        # Sommeil plafonné : recale la boucle si l'horloge système change (synchronisation NTP au démarrage du Pi)
+        self.max_sleep = max_sleep
+        self.heap = []  # (heure d'exécution, numéro, clé) ; entrées obsolètes ignorées au dépilement
+        self.entries = {}  # clé -> (heure d'exécution, numéro, fonction)
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.stopped = False
+
+    def schedule(self, key, run_at: datetime, fn) -> None:
+        """Programme (ou reprogramme) l'exécution de fn à run_at sous la clé 'key'."""
+        with self.condition:
+            number = next(self.counter)
+            self.entries[key] = (run_at, number, fn)
+            heapq.heappush(self.heap, (run_at, number, key))
+            self.condition.notify()
+
+    def cancel(self, key) -> bool:
+        """Annule la prochaine exécution de la clé 'key'. Retourne True si elle était programmée."""
+        with self.condition:
+            removed = self.entries.pop(key, None) is not None
+            self.condition.notify()
+            return removed
+
+    def scheduled(self) -> dict:
+        """Heure de la prochaine exécution de chaque clé programmée."""
+        with self.condition:
+            return {key: run_at for key, (run_at, _, _) in self.entries.items()}
+
+    def next_run_at(self) -> datetime | None:
+        """Heure de la prochaine exécution programmée."""
+        with self.condition:
+            self._drop_stale()
+            return self.heap[0][0] if self.heap else None
+
+    def _drop_stale(self) -> None:
+        """Retire du sommet du tas les entrées annulées ou reprogrammées depuis (la condition doit être tenue)."""
+        while self.heap:
+            run_at, number, key = self.heap[0]
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] == number:
+                return
+            heapq.heappop(self.heap)
+
+    def _next_due(self):
+        """Attend la prochaine échéance et retourne sa fonction, None si l'ordonnanceur est arrêté."""
+        with self.condition:
+            while not self.stopped:
+                self._drop_stale()
+                if not self.heap:
+                    self.condition.wait()
+                    continue
+                run_at, _, key = self.heap[0]
+                delay = (run_at - datetime.now()).total_seconds()
+                if delay > 0:
+                    self.condition.wait(min(delay, self.max_sleep))
+                    continue
+                heapq.heappop(self.heap)
+                return self.entries.pop(key)[2]
+            return None
+
+    def run(self) -> None:
+        """Boucle d'exécution des tâches, jusqu'à stop(). Les tâches doivent rendre la main rapidement."""
+        while (fn := self._next_due()) is not None:
+            try:
+                fn()
+            except Exception as e:
+                print(f"ERREUR lors de l'exécution d'une tâche planifiée : {e}")
+
+    def stop(self) -> None:
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
 
 class JobStore:
     """
     Gère le stockage et la récupération des tâches planifiées
     dans une base de données SQLite.
+    Chaque tâche garde sa prochaine heure d'envoi (next_run_at, indexée) : le scheduler ne lit que les tâches dues.
+    Base en mode WAL avec un pool borné de connexions, empruntées le temps d'une requête SQL par les threads
+    (Flask, scheduler...) : les lectures ne bloquent pas les écritures, et chaque écriture est une transaction explicite.
     """
-    def __init__(self, db_path='scheduler.db'):
+    # Réglages appliqués à chaque connexion : attente (ms) d'un verrou avant l'erreur "database is locked",
+    # synchronisation allégée (sûre en WAL), tables temporaires en mémoire
+    PRAGMAS = ("PRAGMA busy_timeout = 5000", "PRAGMA synchronous = NORMAL", "PRAGMA temp_store = MEMORY")
+
+    def __init__(self, db_path='scheduler.db', pool_size=JOBSTORE_POOL_SIZE):
         """
-        Initialise la connexion à la base de données et crée la table si elle n'existe pas.
+        Initialise la base de données (mode WAL) et crée la table si elle n'existe pas.
         """
         self.db_path = db_path
-        # check_same_thread=False est important pour une utilisation avec Flask
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.pool_size = pool_size
+        self.pool = queue.LifoQueue()  # connexions libres
+        self.opened = 0
+        self.pool_lock = threading.Lock()
+        self.watch_conn = None  # connexion dédiée à data_version()
+        with self.connection() as conn:
+            # Mode persistant, enregistré dans le fichier de la base (hors transaction)
+            conn.execute("PRAGMA journal_mode = WAL")
         self.init_db()
 
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None : pas de transaction implicite, les écritures passent par transaction()
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Emprunte une connexion du pool (ouverte au besoin, au plus pool_size), rendue à la sortie du bloc."""
+        try:
+            conn = self.pool.get_nowait()
+        except queue.Empty:
+            with self.pool_lock:
+                can_open = self.opened < self.pool_size
+                self.opened += can_open
+            if can_open:
+                try:
+                    conn = self._connect()
+                except BaseException:
+                    with self.pool_lock:
+                        self.opened -= 1
+                    raise
+            else:
+                # Pool plein : on attend qu'une connexion soit rendue
+                conn = self.pool.get()
+        try:
+            yield conn
+        finally:
+            self.pool.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Transaction d'écriture : verrou d'écriture pris dès le début (BEGIN IMMEDIATE), validée ou annulée en bloc."""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+
+    def _fetchall(self, sql, params=()) -> list[tuple]:
+        """Lecture hors transaction sur une connexion du pool."""
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
     def init_db(self):
-        """Crée la table 'schedules' si elle n'existe pas déjà."""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS schedules (
-                id INTEGER PRIMARY KEY,
-                symbol TEXT NOT NULL,
-                recipient_email TEXT NOT NULL,
-                frequency TEXT NOT NULL,
-                job_id TEXT NOT NULL
-            )
-        """)
-        self.conn.commit()
+        """Crée la table 'schedules' et ses index si ils n'existent pas déjà."""
+        with self.transaction() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schedules (
+                    id INTEGER PRIMARY KEY,
+                    symbol TEXT NOT NULL,
+                    recipient_email TEXT NOT NULL,
+                    frequency TEXT NOT NULL,
+                    job_id TEXT NOT NULL,
+                    next_run_at TEXT
+                )
+            """)
+            # Migration des bases existantes : prochaine heure d'envoi calculée pour les tâches déjà enregistrées
+            existing = {row[1] for row in cursor.execute("PRAGMA table_info(schedules)")}
+            if 'next_run_at' not in existing:
+                cursor.execute("ALTER TABLE schedules ADD COLUMN next_run_at TEXT")
+            now = datetime.now()
+            for row_id, frequency in cursor.execute("SELECT id, frequency FROM schedules WHERE next_run_at IS NULL").fetchall():
+                if frequency not in FREQUENCIES:
+                    # Ligne invalide : laissée sans échéance, elle n'est jamais envoyée (comme auparavant)
+                    print(f"ATTENTION: tâche id={row_id} ignorée, fréquence inconnue {frequency!r}.")
+                    continue
+                cursor.execute("UPDATE schedules SET next_run_at = ? WHERE id = ?", (_to_db(next_run_time(frequency, now)), row_id))
+            cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_schedules_job_id ON schedules (job_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_schedules_symbol ON schedules (symbol)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_schedules_frequency ON schedules (frequency)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_schedules_next_run_at ON schedules (next_run_at)")
 
     def get_all_schedules(self):
         """Récupère toutes les tâches planifiées depuis la base de données."""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM schedules ORDER BY id DESC")
-        return cursor.fetchall()
+        return self._fetchall("SELECT id, symbol, recipient_email, frequency, job_id, next_run_at FROM schedules ORDER BY id DESC")
+
+    def get_due_schedules(self, now: datetime) -> list[tuple]:
+        """Tâches dont l'heure d'envoi est passée : (job_id, symbol, recipient_email, frequency), via l'index sur next_run_at."""
+        return self._fetchall("SELECT job_id, symbol, recipient_email, frequency FROM schedules WHERE next_run_at <= ? ORDER BY next_run_at",
+                              (_to_db(now),))
+
+    def next_run_at(self) -> datetime | None:
+        """Heure de la prochaine tâche due (lue dans l'index), None si aucune tâche."""
+        value = self._fetchall("SELECT MIN(next_run_at) FROM schedules")[0][0]
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S') if value else None
 
-    def add_schedule(self, symbol, email, frequency, job_id):
+    def data_version(self) -> int:
+        """Compteur SQLite qui change quand une autre connexion (autre thread, autre processus) a modifié la base.
+           Le compteur n'est comparable que sur une même connexion : elle est dédiée à cet usage.
         """
-        Ajoute une nouvelle tâche à la base de données.
+        with self.pool_lock:
+            if self.watch_conn is None:
+                self.watch_conn = self._connect()
+            return self.watch_conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def get_next_runs(self) -> dict[str, datetime]:
+        """Prochaine heure d'envoi de chaque tâche, par job_id (chargement de l'ordonnanceur au démarrage)."""
+        rows = self._fetchall("SELECT job_id, next_run_at FROM schedules WHERE next_run_at IS NOT NULL")
+        return {job_id: datetime.strptime(value, '%Y-%m-%d %H:%M:%S') for job_id, value in rows}
+
+    def mark_done(self, job_ids, now: datetime) -> dict[str, datetime]:
+        """Reporte les tâches exécutées à leur prochaine échéance après 'now' (un seul envoi pour les échéances manquées).
+           Retourne la nouvelle échéance de chaque tâche.
+        """
+        with self.transaction() as cursor:
+            placeholders = ", ".join("?" * len(job_ids))
+            rows = cursor.execute(f"SELECT job_id, frequency FROM schedules WHERE job_id IN ({placeholders})", list(job_ids)).fetchall()
+            next_runs = {job_id: next_run_time(frequency, now) for job_id, frequency in rows}
+            cursor.executemany("UPDATE schedules SET next_run_at = ? WHERE job_id = ?",
+                               [(_to_db(next_run), job_id) for job_id, next_run in next_runs.items()])
+        return next_runs
+
+    def add_schedule(self, symbol, email, frequency, job_id) -> datetime | None:
+        """
+        Ajoute une nouvelle tâche à la base de données et retourne sa première heure d'envoi.
         L'ID de la ligne est géré automatiquement par SQLite.
         """
-        sql = "INSERT INTO schedules (symbol, recipient_email, frequency, job_id) VALUES (?, ?, ?, ?)"
-        params = (symbol, email, frequency, job_id)
+        return self.add_schedules([(symbol, email, frequency, job_id)]).get(job_id)
+
+    def add_schedules(self, schedules) -> dict[str, datetime]:
+        """
+        Ajoute en une seule transaction des tâches (symbol, email, frequency, job_id).
+        Retourne la première heure d'envoi de chaque tâche ajoutée (vide en cas d'erreur : aucune n'est ajoutée).
+        """
+        now = datetime.now()
+        sql = "INSERT INTO schedules (symbol, recipient_email, frequency, job_id, next_run_at) VALUES (?, ?, ?, ?, ?)"
         
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(sql, params)
-            self.conn.commit()
-            print(f"INFO: Tâche pour {symbol} ajoutée à la base de données avec succès.")
-        except sqlite3.Error as e:
-            # Affiche une erreur claire si l'insertion échoue
-            print(f"ERREUR BDD lors de l'ajout de la tâche : {e}")
+            next_runs = {job_id: next_run_time(frequency, now) for _, _, frequency, job_id in schedules}
+            params = [(symbol, email, frequency, job_id, _to_db(next_runs[job_id])) for symbol, email, frequency, job_id in schedules]
+            with self.transaction() as cursor:
+                cursor.executemany(sql, params)
+            print(f"INFO: {len(params)} tâche(s) ajoutée(s) à la base de données avec succès.")
+            return next_runs
+        except (sqlite3.Error, ValueError) as e:
+            # Affiche une erreur claire si l'insertion échoue (ou si une fréquence est inconnue)
+            print(f"ERREUR BDD lors de l'ajout des tâches : {e}")
+            return {}
 
-    def remove_schedule_by_id(self, schedule_id):
-        """Supprime une tâche de la base de données en utilisant son ID de ligne."""
-        sql = "DELETE FROM schedules WHERE id = ?"
+    def remove_schedule(self, job_id) -> bool:
+        """Supprime une tâche de la base de données à partir de son identifiant job_id. Retourne True si elle existait."""
+        return self.remove_schedules([job_id]) > 0
+
+    def remove_schedules(self, job_ids) -> int:
+        """Supprime en une seule transaction les tâches d'identifiants job_ids. Retourne le nombre de tâches supprimées."""
+        sql = "DELETE FROM schedules WHERE job_id = ?"
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(sql, (schedule_id,))
-            self.conn.commit()
-            print(f"INFO: Tâche avec id={schedule_id} supprimée de la base de données.")
+            with self.transaction() as cursor:
+                cursor.executemany(sql, [(job_id,) for job_id in job_ids])
+                removed = cursor.rowcount
+            print(f"INFO: {removed} tâche(s) supprimée(s) de la base de données.")
+            return removed
         except sqlite3.Error as e:
-            print(f"ERREUR BDD lors de la suppression de la tâche (id={schedule_id}): {e}")
+            print(f"ERREUR BDD lors de la suppression des tâches {list(job_ids)} : {e}")
+            return 0
+
+    def close(self) -> None:
+        """Ferme les connexions libres du pool (et celle de data_version)."""
+        with self.pool_lock:
+            while True:
+                try:
+                    self.pool.get_nowait().close()
+                except queue.Empty:
+                    break
+                self.opened -= 1
+            if self.watch_conn is not None:
+                self.watch_conn.close()
+                self.watch_conn = None
 
     def __del__(self):
-        """Ferme la connexion à la base de données lorsque l'objet est détruit."""
-        if self.conn:
-            self.conn.close()
\ No newline at end of file
+        """Ferme les connexions à la base de données lorsque l'objet est détruit."""
+        self.close()
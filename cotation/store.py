@@ -0,0 +1,126 @@
+import sqlite3
+import threading
+
+import polars as pl
+
+# Colonnes ajoutées après la création de la table (champs de bougie conservés en plus de l'OHLCV) : (colonne SQL, colonne DataFrame, type)
+EXTRA_COLUMNS = [
+    ("quote_volume", "Quote Volume", pl.Float64), ("trades", "Trades", pl.Int64),
+    ("taker_buy_volume", "Taker Buy Volume", pl.Float64), ("taker_buy_quote_volume", "Taker Buy Quote Volume", pl.Float64),
+]
+
+
+class KlineStore:
+    """
+    Stocke localement les bougies (klines) Binance dans une base SQLite,
+    indexées par (symbol, interval), pour éviter de tout retélécharger à chaque appel.
+    """
+    def __init__(self, db_path='klines.db'):
+        """Initialise la connexion à la base de données et crée les tables si besoin."""
+        self.db_path = db_path
+        # check_same_thread=False : la base est partagée entre Flask et le scheduler
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        # WAL et attente du verrou : la base peut aussi être partagée entre les processus workers du serveur WSGI
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA busy_timeout = 5000")
+        self.lock = threading.Lock()
+        self.init_db()
+
+    def init_db(self):
+        """Crée les tables 'klines' et 'kline_ranges' si elles n'existent pas déjà."""
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS klines (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    open_time INTEGER NOT NULL,
+                    open REAL NOT NULL,
+                    high REAL NOT NULL,
+                    low REAL NOT NULL,
+                    close REAL NOT NULL,
+                    volume REAL NOT NULL,
+                    PRIMARY KEY (symbol, interval, open_time)
+                ) WITHOUT ROWID
+            """)
+            # Migration des bases existantes : colonnes ajoutées vides (NULL) pour les bougies déjà stockées
+            existing = {row[1] for row in cursor.execute("PRAGMA table_info(klines)")}
+            for column, _, dtype in EXTRA_COLUMNS:
+                if column not in existing:
+                    cursor.execute(f"ALTER TABLE klines ADD COLUMN {column} {'INTEGER' if dtype == pl.Int64 else 'REAL'}")
+            # Début de la plage déjà couverte : évite de redemander un historique
+            # antérieur à la création de la paire sur Binance.
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS kline_ranges (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    start_time INTEGER NOT NULL,
+                    PRIMARY KEY (symbol, interval)
+                )
+            """)
+            self.conn.commit()
+
+    def get_bounds(self, symbol, interval) -> tuple[int | None, int | None]:
+        """Retourne (début couvert, Open Time de la dernière bougie) en millisecondes."""
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT start_time FROM kline_ranges WHERE symbol = ? AND interval = ?", (symbol, interval))
+            row = cursor.fetchone()
+            start_time = row[0] if row else None
+            cursor.execute("SELECT MAX(open_time) FROM klines WHERE symbol = ? AND interval = ?", (symbol, interval))
+            last_open_time = cursor.fetchone()[0]
+        return start_time, last_open_time
+
+    def upsert_klines(self, symbol, interval, df_klines: pl.DataFrame, start_time=None) -> None:
+        """
+        Ajoute (ou remplace) des bougies (DataFrame de cotations.klines_to_frame / parse_klines).
+        La dernière bougie stockée peut être encore en cours : elle est écrasée par la version la plus récente.
+        """
+        rows = df_klines.select(
+            pl.lit(symbol).alias("symbol"), pl.lit(interval).alias("interval"), pl.col("Open Time").dt.epoch("ms"),
+            "Open", "High", "Low", "Close", "Volume", *[name for _, name, _ in EXTRA_COLUMNS],
+        ).iter_rows()
+        columns = ", ".join(column for column, _, _ in EXTRA_COLUMNS)
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.executemany(
+                    f"INSERT OR REPLACE INTO klines (symbol, interval, open_time, open, high, low, close, volume, {columns}) "
+                    f"VALUES (?, ?, ?, ?, ?, ?, ?, ?{', ?' * len(EXTRA_COLUMNS)})", rows
+                )
+                if start_time is not None:
+                    cursor.execute(
+                        "INSERT INTO kline_ranges (symbol, interval, start_time) VALUES (?, ?, ?) "
+                        "ON CONFLICT(symbol, interval) DO UPDATE SET start_time = MIN(start_time, excluded.start_time)",
+                        (symbol, interval, int(start_time))
+                    )
+                self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"ERREUR BDD lors de l'enregistrement des bougies {symbol} {interval} : {e}")
+
+    def get_klines(self, symbol, interval, start_time) -> pl.DataFrame | None:
+        """Retourne les bougies stockées depuis start_time (ms) : OHLCV et champs complémentaires, ou None si aucune."""
+        columns = ", ".join(column for column, _, _ in EXTRA_COLUMNS)
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                f"SELECT open_time, open, high, low, close, volume, {columns} FROM klines "
+                "WHERE symbol = ? AND interval = ? AND open_time >= ? ORDER BY open_time",
+                (symbol, interval, int(start_time))
+            )
+            rows = cursor.fetchall()
+        if not rows:
+            return None
+
+        df = pl.DataFrame(
+            rows, orient="row",
+            schema={"Open Time": pl.Int64, "Open": pl.Float64, "High": pl.Float64,
+                    "Low": pl.Float64, "Close": pl.Float64, "Volume": pl.Float64,
+                    **{name: dtype for _, name, dtype in EXTRA_COLUMNS}},
+        )
+        return df.with_columns(pl.col("Open Time").cast(pl.Datetime(time_unit="ms")))
+
+    def __del__(self):
+        """Ferme la connexion à la base de données lorsque l'objet est détruit."""
+        if self.conn:
+            self.conn.close()
@@ -0,0 +1,100 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from backfill import BulkKlineFetcher
+from cotations import klines_to_frame, parse_klines
+
+
+MINUTE_MS = 60 * 1000
+
+
+class MockBinanceHandler(BaseHTTPRequestHandler):
+    """API klines simulée : bougies minute, 429 sur les premières requêtes, poids consommé dans les en-têtes."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        query = {k: int(v[0]) if v[0].isdigit() else v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        with server.lock:
+            server.requests += 1
+            server.running += 1
+            server.peak = max(server.peak, server.running)
+            rejected = server.requests <= server.reject_first
+        try:
+            time.sleep(0.05)
+            if rejected:
+                self.send_response(429)
+                self.send_header('Retry-After', '0')
+                self.end_headers()
+                return
+            first = -(-query['startTime'] // MINUTE_MS) * MINUTE_MS
+            last = min(query['endTime'], first + (query['limit'] - 1) * MINUTE_MS)
+            body = json.dumps([[t, "1.0", "2.0", "0.5", "1.5", "10.0", t + MINUTE_MS - 1, "15.0", 3, "4.0", "6.0", "0"] for t in range(first, last + 1, MINUTE_MS)]).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('X-MBX-USED-WEIGHT-1M', str(server.requests * 2))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.running -= 1
+
+
+def start_server(reject_first=0):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockBinanceHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests, server.running, server.peak, server.reject_first = 0, 0, 0, reject_first
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_bulk_fetch():
+    server = start_server(reject_first=2)
+    fetcher = BulkKlineFetcher(base_url=f"http://127.0.0.1:{server.server_address[1]}", workers=4, backoff=0.01)
+    start_ms = 1_700_000_000_000 // MINUTE_MS * MINUTE_MS
+    end_ms = start_ms + 10_499 * MINUTE_MS  # 10 500 bougies : 11 pages
+
+    klines = fetcher.fetch("BTCUSDC", "1m", start_ms, end_ms)
+    assert klines.get_column("Open Time").dt.epoch("ms").to_list() == list(range(start_ms, end_ms + 1, MINUTE_MS))
+    assert klines.row(0)[1:] == (1.0, 2.0, 0.5, 1.5, 10.0, 15.0, 3, 4.0, 6.0)
+    assert server.requests == 11 + 2  # 2 pages refusées (429) puis réessayées
+    assert server.peak == 4
+    server.shutdown()
+
+
+def test_weight_limit():
+    server = start_server()
+    # 12 de poids par minute : 6 requêtes immédiates, puis une toutes les 10 s -> la 7e attend
+    fetcher = BulkKlineFetcher(base_url=f"http://127.0.0.1:{server.server_address[1]}", workers=4, weight_per_minute=12)
+    fetcher.limiter.rate = 2 / 0.2  # accéléré pour le test : une requête de plus toutes les 0.2 s
+    start = time.monotonic()
+    fetcher.fetch("BTCUSDC", "1m", 0, 7 * 1000 * MINUTE_MS - 1)
+    assert time.monotonic() - start >= 0.2
+    server.shutdown()
+
+
+def test_parse_klines_formatting():
+    start_ms = 1_700_000_000_123
+    klines = [[t, "1.0", "2.0", "0.5", "1.5", "10.0", t + MINUTE_MS - 1, "15.0", 3, "4.0", "6.0", "0"] for t in range(start_ms, start_ms + 3 * MINUTE_MS, MINUTE_MS)]
+    expected = klines_to_frame(klines)
+    assert expected.row(2)[1:] == (1.0, 2.0, 0.5, 1.5, 10.0, 15.0, 3, 4.0, 6.0)
+    # Horodatages en millisecondes conservés exactement
+    assert expected.get_column("Open Time").dt.epoch("ms").to_list() == [row[0] for row in klines]
+    # Même résultat quel que soit le formatage du corps : compact, espacé, indenté, nombres au lieu de textes
+    for body in (json.dumps(klines, separators=(',', ':')), json.dumps(klines), json.dumps(klines, indent=2),
+                 json.dumps([[float(v) if isinstance(v, str) else v for v in row] for row in klines], indent="\t")):
+        assert parse_klines(body.encode()).equals(expected)
+    assert parse_klines(b"[]").equals(klines_to_frame([]))
+
+
+if __name__ == "__main__":
+    test_parse_klines_formatting()
+    test_bulk_fetch()
+    test_weight_limit()
+    print("Téléchargement parallèle : OK")
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+from cache import ResponseCache, SharedCache, candle_open_time
+
+
+def test_candle_open_time():
+    # 2024-05-15 13:37 UTC est un mercredi
+    now = datetime(2024, 5, 15, 13, 37, tzinfo=timezone.utc).timestamp()
+    assert candle_open_time('5m', now) == datetime(2024, 5, 15, 13, 35, tzinfo=timezone.utc).timestamp()
+    assert candle_open_time('4h', now) == datetime(2024, 5, 15, 12, 0, tzinfo=timezone.utc).timestamp()
+    # Les bougies hebdomadaires Binance s'ouvrent le lundi à 00:00 UTC
+    assert candle_open_time('1w', now) == datetime(2024, 5, 13, tzinfo=timezone.utc).timestamp()
+
+
+def test_eviction_and_expiry():
+    cache = ResponseCache(max_bytes=10)
+    far = time.time() + 60
+    cache.put('a', b'1234', far)
+    cache.put('b', b'1234', far)
+    cache.get('a')  # 'a' devient la plus récemment utilisée
+    cache.put('c', b'1234', far)
+    assert cache.get('b') is None
+    assert cache.get('a') == b'1234' and cache.get('c') == b'1234'
+    assert cache.size == 8
+
+    cache.put('d', b'12', time.time() - 1)
+    assert cache.get('d') is None
+    cache.put('e', b'x' * 11, far)  # plus gros que le cache : ignoré
+    assert cache.get('e') is None
+
+
+def test_single_flight():
+    cache = ResponseCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return b'{"ok": true}'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('k', time.time() + 60, compute)))
+               for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    assert len(calls) == 1
+    assert results == [b'{"ok": true}'] * 8
+
+
+def test_shared_tier():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.db")
+        # Deux workers : mémoires distinctes, même cache partagé
+        worker_a, worker_b = ResponseCache(shared=SharedCache(path)), ResponseCache(shared=SharedCache(path))
+        calls = []
+        compute = lambda: calls.append(1) or b'{"ok": true}'
+        expires_at = time.time() + 60
+
+        assert worker_a.get_or_compute(('BTCUSDC', '1s', 0), expires_at, compute) == b'{"ok": true}'
+        assert worker_b.get_or_compute(('BTCUSDC', '1s', 0), expires_at, compute) == b'{"ok": true}'
+        assert len(calls) == 1 and worker_b.get(('BTCUSDC', '1s', 0)) == b'{"ok": true}'
+
+        # Entrée expirée : recalculée
+        worker_a.shared.put('old', b'x', time.time() - 1)
+        assert worker_b.shared.get('old') is None
+
+
+if __name__ == "__main__":
+    test_candle_open_time()
+    test_eviction_and_expiry()
+    test_single_flight()
+    test_shared_tier()
+    print("Cache des réponses : OK")
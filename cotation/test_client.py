@@ -0,0 +1,22 @@
+from unittest import mock
+
+from binance.client import Client
+
+import exchange
+from cotations import BinanceAPI
+from exchange import get_client
+
+
+def test_shared_client_without_network():
+    # Aucun appel réseau à la création du client, client partagé recréé pour le test
+    with mock.patch.object(Client, "ping", side_effect=AssertionError("appel réseau inattendu")), \
+            mock.patch.object(exchange, "_client", None):
+        api, other_api = BinanceAPI(), BinanceAPI()
+        assert exchange._client is None  # rien n'est créé avant la première requête
+        assert api.client is other_api.client is get_client()
+        assert api.client.session.get_adapter("https://api.binance.com")._pool_maxsize == exchange.BINANCE_POOL_SIZE
+
+
+if __name__ == "__main__":
+    test_shared_client_without_network()
+    print("Client Binance partagé : OK")
@@ -0,0 +1,113 @@
+import socketserver
+import tempfile
+import threading
+import time
+
+from emailer import SimpleEmailer
+
+
+class LocalSMTPHandler(socketserver.StreamRequestHandler):
+    """Serveur SMTP minimal de test : accepte tout et compte connexions et messages."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 localhost")
+        while line := self.rfile.readline():
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 localhost")
+            elif command == "DATA":
+                self.reply("354 fin par <CRLF>.<CRLF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with server.lock:
+                    server.sending += 1
+                    server.peak = max(server.peak, server.sending)
+                time.sleep(server.delay)
+                with server.lock:
+                    server.sending -= 1
+                server.messages += 1
+                self.reply("250 OK")
+                # Simule un serveur qui coupe la connexion après un certain nombre de messages
+                if server.messages == server.drop_after:
+                    return
+            elif command == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+def start_server(drop_after=None, delay=0.0):
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), LocalSMTPHandler)
+    server.daemon_threads = True
+    server.connections, server.messages, server.drop_after, server.delay = 0, 0, drop_after, delay
+    server.lock = threading.Lock()
+    server.sending, server.peak = 0, 0  # messages en cours de réception, et leur maximum
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_emailer(server, **kwargs):
+    emailer = SimpleEmailer(smtp_server="127.0.0.1", smtp_port=server.server_address[1],
+                            user="rascrypto@local", use_ssl=False, **kwargs)
+    emailer.password = None  # le serveur local n'exige pas d'authentification
+    return emailer
+
+
+def test_one_connection_per_batch():
+    server = start_server()
+    with tempfile.NamedTemporaryFile(suffix=".png") as image, make_emailer(server) as emailer:
+        image.write(b"\x89PNG\r\n\x1a\n")
+        image.flush()
+        for i in range(5):
+            emailer.send_html_with_images("test@local.com", f"Rapport {i}", "<p>ok</p><img src=\"{img0}\">", [image.name])
+    assert server.connections == 1 and server.messages == 5
+
+    # Hors session : une connexion par message, comme auparavant
+    emailer = make_emailer(server)
+    emailer.send_html_with_images("test@local.com", "Rapport", "<p>ok</p>", [])
+    assert server.connections == 2
+    server.shutdown()
+
+
+def test_reconnect_and_throttle():
+    server = start_server(drop_after=2)
+    start = time.monotonic()
+    with make_emailer(server, max_per_minute=600) as emailer:
+        for i in range(4):
+            # Images directement en mémoire, sans fichier temporaire
+            emailer.send_html_with_images("test@local.com", f"Rapport {i}", "<p>ok</p><img src=\"{img0}\">", [b"\x89PNG\r\n\x1a\n"])
+    assert server.messages == 4 and server.connections == 2
+    assert time.monotonic() - start >= 0.3  # 4 envois espacés de 0.1s
+    server.shutdown()
+
+
+def test_parallel_sends_with_throttle():
+    server = start_server(delay=0.2)  # 0.2s par message côté serveur
+    emailer = make_emailer(server, max_per_minute=600)  # hors session (une connexion par message), un envoi par 0.1s
+    start = time.monotonic()
+    threads = [threading.Thread(target=lambda: [emailer.send_html_with_images("test@local.com", "Rapport", "<p>ok</p>", [])
+                                                for _ in range(3)]) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+    assert server.messages == 6 and server.connections == 6
+    # Débit respecté : 6 créneaux espacés de 0.1s
+    assert elapsed >= 0.5, elapsed
+    # Les deux threads envoient en même temps (l'attente du créneau ne bloque plus l'envoi de l'autre)
+    assert server.peak == 2
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    test_one_connection_per_batch()
+    test_reconnect_and_throttle()
+    test_parallel_sends_with_throttle()
+    print("Envoi SMTP en session : OK")
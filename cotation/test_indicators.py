@@ -0,0 +1,47 @@
+import math
+import random
+
+import polars as pl
+
+from analysis import TechnicalChartBuilder
+from indicators import IndicatorEngine
+from info import PERIOD_SHORT, PERIOD_LONG
+
+
+COLUMNS = ["MA_short", "MA_long", "MACD_line", "MACD_signal", "MACD_hist", "RSI_14"]
+
+
+def reference(closes) -> pl.DataFrame:
+    """Indicateurs recalculés sur tout l'historique par les expressions Polars de TechnicalChartBuilder."""
+    builder = TechnicalChartBuilder()
+    df = builder.add_moving_averages(pl.DataFrame({"Close": closes}), PERIOD_SHORT, PERIOD_LONG)
+    return builder.add_oscillators(df)
+
+
+def assert_close(expected, actual):
+    if math.isnan(expected):
+        assert math.isnan(actual)
+    else:
+        assert math.isclose(expected, actual, rel_tol=1e-9, abs_tol=1e-9), (expected, actual)
+
+
+def test_matches_polars():
+    random.seed(1)
+    # Début à prix constant : RSI indéfini (0/0) puis hausse seule (RSI à 100), comme dans Polars
+    closes = [100.0] * 5 + [100.0 + i for i in range(5)]
+    closes += [closes[-1] + random.gauss(0, 2) for _ in range(300)]
+    expected = reference(closes)
+
+    engine = IndicatorEngine()
+    for i, close in enumerate(closes):
+        # Bougie en cours mise à jour plusieurs fois avant sa valeur finale
+        engine.push(close + 3)
+        engine.replace_last(close - 1)
+        values = engine.replace_last(close)
+        for column in COLUMNS:
+            assert_close(expected.item(i, column), values[column])
+
+
+if __name__ == "__main__":
+    test_matches_polars()
+    print("Indicateurs incrémentaux : OK")
@@ -0,0 +1,193 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from scheduler import JobStore, TaskScheduler, next_run_time
+
+
+def test_next_run_time():
+    saturday = datetime(2025, 5, 31, 12, 0)
+    assert next_run_time('daily', saturday, '07:00') == datetime(2025, 6, 1, 7, 0)
+    assert next_run_time('daily', datetime(2025, 5, 31, 6, 0), '07:00') == datetime(2025, 5, 31, 7, 0)
+    assert next_run_time('weekly', saturday, '07:00') == datetime(2025, 6, 1, 7, 0)  # dimanche
+    assert next_run_time('monthly', datetime(2025, 6, 1, 7, 0), '07:00') == datetime(2025, 7, 1, 7, 0)
+    try:
+        next_run_time('Daily', saturday)
+        assert False, "fréquence inconnue acceptée"
+    except ValueError:
+        pass
+
+
+def test_due_schedules_and_reschedule():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = JobStore(os.path.join(tmp, "scheduler.db"))
+        first_run = db.add_schedule("BTCUSDC", "a@local.com", "daily", "job_a")
+        db.add_schedule("ETHUSDC", "b@local.com", "monthly", "job_b")
+        assert db.next_run_at() == first_run
+
+        assert db.get_due_schedules(first_run - timedelta(minutes=1)) == []
+        # (la tâche mensuelle n'est due au même moment que si le premier envoi tombe le 1er du mois)
+        assert ("job_a", "BTCUSDC", "a@local.com", "daily") in db.get_due_schedules(first_run)
+
+        # Après exécution, la tâche est reportée au lendemain et n'est plus due
+        db.mark_done(["job_a", "job_b"], first_run)
+        assert db.get_due_schedules(first_run) == []
+        assert db.next_run_at() > first_run
+
+        # Suppression par job_id
+        assert db.remove_schedule("job_a") and not db.remove_schedule("job_a")
+        assert [row[4] for row in db.get_all_schedules()] == ["job_b"]
+
+        # La recherche des tâches dues passe par l'index
+        plan = db._fetchall("EXPLAIN QUERY PLAN SELECT job_id FROM schedules WHERE next_run_at <= ?", ("x",))
+        assert "idx_schedules_next_run_at" in str(plan)
+
+
+def test_migration_of_existing_database():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "scheduler.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE schedules (id INTEGER PRIMARY KEY, symbol TEXT NOT NULL, recipient_email TEXT NOT NULL, "
+                     "frequency TEXT NOT NULL, job_id TEXT NOT NULL)")
+        conn.execute("INSERT INTO schedules (symbol, recipient_email, frequency, job_id) VALUES ('BTCUSDC', 'a@local.com', 'weekly', 'job_old')")
+        conn.execute("INSERT INTO schedules (symbol, recipient_email, frequency, job_id) VALUES ('BTCUSDC', 'b@local.com', 'Daily', 'job_bad')")
+        conn.commit()
+        conn.close()
+
+        db = JobStore(path)
+        bad, row = db.get_all_schedules()
+        assert row[4] == "job_old" and datetime.strptime(row[5], '%Y-%m-%d %H:%M:%S').weekday() == 6
+        # Fréquence inconnue : la ligne est gardée mais jamais programmée
+        assert bad[4] == "job_bad" and bad[5] is None
+        assert list(db.get_next_runs()) == ["job_old"]
+        assert db.add_schedule("BTCUSDC", "c@local.com", "hourly", "job_c") is None
+
+
+def test_bulk_add_and_remove():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = JobStore(os.path.join(tmp, "scheduler.db"))
+        assert db._fetchall("PRAGMA journal_mode") == [("wal",)]
+        next_runs = db.add_schedules([("BTCUSDC", f"{i}@local.com", "daily", f"job_{i}") for i in range(50)])
+        assert len(next_runs) == 50 and len(db.get_all_schedules()) == 50
+
+        # Transaction annulée en bloc : un job_id en double n'ajoute aucune des tâches du lot
+        assert db.add_schedules([("ETHUSDC", "x@local.com", "daily", "job_new"), ("ETHUSDC", "y@local.com", "daily", "job_0")]) == {}
+        assert len(db.get_all_schedules()) == 50
+
+        assert db.remove_schedules([f"job_{i}" for i in range(0, 50, 2)] + ["unknown"]) == 25
+        assert len(db.get_all_schedules()) == 25
+        db.close()
+
+
+def test_concurrent_readers_and_writers():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "scheduler.db")
+        db = JobStore(path)
+        other = JobStore(path)  # second accès à la même base (autre processus, autre instance...)
+        errors = []
+
+        def writer(store, prefix):
+            try:
+                for i in range(100):
+                    job_id = f"{prefix}_{i}"
+                    assert store.add_schedule("BTCUSDC", "w@local.com", "daily", job_id)
+                    if i % 2:
+                        assert store.remove_schedule(job_id)
+                    else:
+                        store.mark_done([job_id], datetime.now())
+            except Exception as e:
+                errors.append(e)
+
+        def reader(store):
+            try:
+                for _ in range(200):
+                    store.get_all_schedules()
+                    store.get_due_schedules(datetime.now())
+                    store.next_run_at()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(store, f"w{n}")) for n, store in enumerate((db, other, db, other))]
+        threads += [threading.Thread(target=reader, args=(store,)) for store in (db, other, db, other)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Aucune erreur "database is locked", et toutes les écritures sont visibles des deux instances
+        assert errors == []
+        assert len(db.get_all_schedules()) == len(other.get_all_schedules()) == 4 * 50
+        db.close()
+        other.close()
+
+
+def test_bounded_connection_pool():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = JobStore(os.path.join(tmp, "scheduler.db"), pool_size=3)
+        db.add_schedule("BTCUSDC", "a@local.com", "daily", "job_a")
+        # Un thread par requête (serveur de développement Flask) : les connexions sont réutilisées, pas accumulées
+        threads = [threading.Thread(target=db.get_all_schedules) for _ in range(200)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert db.opened <= 3 and db.pool.qsize() == db.opened
+        db.close()
+        assert db.opened == 0
+
+
+def test_task_scheduler():
+    scheduler = TaskScheduler()
+    runs = []
+    thread = threading.Thread(target=scheduler.run, daemon=True)
+    thread.start()
+    now = datetime.now()
+
+    # Échéance passée (tâche manquée pendant un arrêt) : exécutée aussitôt
+    scheduler.schedule("missed", now - timedelta(hours=1), lambda: runs.append("missed"))
+    # Ajoutée pendant que la boucle dort sans échéance : la condition la réveille
+    scheduler.schedule("b", now + timedelta(seconds=0.2), lambda: runs.append("b"))
+    scheduler.schedule("a", now + timedelta(seconds=0.1), lambda: runs.append("a"))
+    scheduler.schedule("cancelled", now + timedelta(seconds=0.1), lambda: runs.append("cancelled"))
+    assert scheduler.cancel("cancelled") and not scheduler.cancel("unknown")
+    # Reprogrammée : seule la dernière échéance compte
+    scheduler.schedule("moved", now + timedelta(seconds=0.05), lambda: runs.append("moved-early"))
+    scheduler.schedule("moved", now + timedelta(seconds=0.3), lambda: runs.append("moved"))
+    assert scheduler.next_run_at() is not None
+
+    time.sleep(0.5)
+    scheduler.stop()
+    thread.join(timeout=1)
+    assert runs == ["missed", "a", "b", "moved"] and not thread.is_alive()
+    assert scheduler.next_run_at() is None
+
+
+def test_task_scheduler_wakes_on_deadline_only():
+    scheduler = TaskScheduler()
+    waits = []
+    wait = scheduler.condition.wait
+    scheduler.condition.wait = lambda timeout=None: waits.append(timeout) or wait(timeout)
+    fired = threading.Event()
+    scheduler.schedule("job", datetime.now() + timedelta(seconds=0.3), fired.set)
+    thread = threading.Thread(target=scheduler.run, daemon=True)
+    thread.start()
+    assert fired.wait(1)
+    scheduler.stop()
+    thread.join(timeout=1)
+    # Une seule attente jusqu'à l'échéance (pas de réveil chaque seconde), puis l'attente de la tâche suivante
+    assert len(waits) <= 3 and 0.2 < waits[0] <= 0.3
+
+
+if __name__ == "__main__":
+    test_next_run_time()
+    test_due_schedules_and_reschedule()
+    test_migration_of_existing_database()
+    test_bulk_add_and_remove()
+    test_concurrent_readers_and_writers()
+    test_bounded_connection_pool()
+    test_task_scheduler()
+    test_task_scheduler_wakes_on_deadline_only()
+    print("Tâches planifiées indexées : OK")
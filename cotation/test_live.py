@@ -0,0 +1,86 @@
+import json
+import threading
+from datetime import datetime
+
+import polars as pl
+
+from analysis import TechnicalChartBuilder
+from live import LiveMarket, ReplayKlineFeed
+
+
+HOUR_MS = 3600 * 1000
+START_MS = 1_700_000_000_000 // HOUR_MS * HOUR_MS
+
+
+def make_history(n=60):
+    """Historique horaire de n bougies, au format de BinanceAPI.get_historical_data."""
+    return pl.DataFrame({
+        "Open Time": [START_MS + i * HOUR_MS for i in range(n)],
+        "Open": [100.0 + i for i in range(n)], "High": [101.0 + i for i in range(n)],
+        "Low": [99.0 + i for i in range(n)], "Close": [100.5 + i for i in range(n)],
+        "Volume": [10.0] * n,
+    }).with_columns(pl.col("Open Time").cast(pl.Datetime(time_unit="ms")))
+
+
+def make_kline(open_time, close, closed=False):
+    """Bougie au format 'k' du flux kline Binance."""
+    return {'t': open_time, 'o': '150', 'h': str(close + 1), 'l': '149', 'c': str(close), 'v': '5', 'x': closed}
+
+
+class FakeBinanceAPI:
+    def get_historical_data(self, symbol, interval, start_date_str):
+        return make_history()
+
+
+def test_live_updates():
+    last_ms = START_MS + 59 * HOUR_MS
+    feed = ReplayKlineFeed([
+        make_kline(last_ms, 170.0),                     # bougie en cours : remplace la dernière
+        make_kline(last_ms, 171.0, closed=True),        # clôture de cette bougie
+        make_kline(last_ms + HOUR_MS, 172.0),           # nouvelle bougie : ajoutée
+        make_kline(last_ms - HOUR_MS, 1.0),             # bougie en retard : ignorée
+    ])
+    market = LiveMarket(feed, FakeBinanceAPI(), TechnicalChartBuilder())
+    stream, listener = market.listen("ETHUSDC", "1h", 2)
+    events = market.events("ETHUSDC", "1h", stream, listener, keep_alive=5)
+
+    updates = [json.loads(next(events).removeprefix("data: ")) for _ in range(3)]
+    assert [u['close'] for u in updates] == [170.0, 171.0, 172.0]
+    assert updates[0]['x'] == updates[1]['x'] == datetime.utcfromtimestamp(last_ms / 1000).strftime('%Y-%m-%dT%H:%M:%S')
+    assert updates[1]['closed'] and not updates[2]['closed']
+    assert stream.df.height == 61 and stream.df.item(-2, "Close") == 171.0
+    assert updates[2]['summary_stats']['close'] == 172.0 and updates[2]['ma_short'] is not None
+
+    # Déconnexion du dernier client : le flux est fermé
+    events.close()
+    assert not market.streams and not feed.stops
+    # Second désabonnement (fermeture de la réponse HTTP après celle du générateur) : sans effet
+    market.unlisten("ETHUSDC", "1h", stream, listener)
+    assert stream.unlisten(listener) is None
+
+
+def test_slow_history_does_not_block_other_streams():
+    started, release = threading.Event(), threading.Event()
+
+    class SlowBinanceAPI:
+        def get_historical_data(self, symbol, interval, start_date_str):
+            if symbol == "BTCUSDC":
+                started.set()
+                release.wait(5)  # long historique ('5a'...) en cours de téléchargement
+            return make_history()
+
+    market = LiveMarket(ReplayKlineFeed([]), SlowBinanceAPI(), TechnicalChartBuilder())
+    slow = threading.Thread(target=market.listen, args=("BTCUSDC", "1w", 1825))
+    slow.start()
+    started.wait(1)
+    # Un autre flux s'ouvre sans attendre la fin du téléchargement
+    assert market.listen("ETHUSDC", "1h", 2) is not None and slow.is_alive()
+    release.set()
+    slow.join()
+    assert set(market.streams) == {("BTCUSDC", "1w"), ("ETHUSDC", "1h")}
+
+
+if __name__ == "__main__":
+    test_live_updates()
+    test_slow_history_does_not_block_other_streams()
+    print("Flux en direct : OK")
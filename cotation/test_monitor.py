@@ -0,0 +1,37 @@
+import itertools
+import time
+
+from monitor import SystemSampler, read_system_stats
+
+
+def test_read_system_stats():
+    sample = read_system_stats()
+    assert set(sample) == {'time', 'cpu_usage', 'cpu_cores_usage', 'cpu_temp', 'ram', 'disk'}
+    assert 0 <= sample['ram']['percent'] <= 100 and sample['disk']['total'] > 0
+
+
+def test_sampler_ring_buffer():
+    counter = itertools.count()
+    probe = lambda: {'time': next(counter), 'cpu_usage': 1.0, 'cpu_temp': 40.0, 'ram': {'percent': 50.0}, 'disk': {'percent': 20.0}}
+    sampler = SystemSampler(interval=0.01, size=5, probe=probe)
+
+    # Premier relevé disponible immédiatement, sans attendre l'intervalle
+    start = time.perf_counter()
+    assert sampler.latest()['time'] == 0
+    assert time.perf_counter() - start < 0.1
+
+    time.sleep(0.2)
+    sampler.stop()
+    sampler.thread.join()
+    history = sampler.history(10)
+    # Tampon circulaire : seuls les 5 derniers relevés sont gardés, dans l'ordre
+    assert len(history['time']) == 5 and history['time'] == sorted(history['time'])
+    assert history['time'][-1] == sampler.latest()['time'] > 5
+    assert sampler.history(2)['ram_percent'] == [50.0, 50.0]
+    assert sampler.history(0)['time'] == []
+
+
+if __name__ == "__main__":
+    test_read_system_stats()
+    test_sampler_ring_buffer()
+    print("Relevés système en tâche de fond : OK")
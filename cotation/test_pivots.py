@@ -0,0 +1,35 @@
+import polars as pl
+
+from analysis import TechnicalChartBuilder
+from bench_historique import synthetic_ohlcv
+from bench_pivots import legacy_pivot_levels
+
+
+def test_same_levels_as_shifted_comparisons():
+    builder = TechnicalChartBuilder()
+    for n in (5, 30, 2_000):
+        # Prix arrondis : beaucoup d'égalités dans les fenêtres
+        df = synthetic_ohlcv(n, 60).with_columns(pl.col("Low").round(0), pl.col("High").round(0))
+        for window in (1, 10, 30):
+            assert builder.add_pivot_levels(df, window).equals(legacy_pivot_levels(df, window)), (n, window)
+
+
+def test_consolidate_levels():
+    builder = TechnicalChartBuilder()
+    # Pivots successifs (forward_fill) : 100 et 100.4 touchés 3 fois au total, 120 deux fois, 90 une fois (le plus récent)
+    supports = [None, 100.0, 100.0, 120.0, 100.4, 120.0, 100.0, 90.0]
+    df = pl.DataFrame({"Support": supports, "High": [1.0] * 8, "Low": [0.0] * 8, "Close": [0.5] * 8})
+
+    assert builder.consolidate_levels(df, "Support", tolerance=1.0) == [(100.0 + 100.0 + 100.4) / 3, 120.0, 90.0]
+    assert builder.consolidate_levels(df, "Support", max_levels=2, tolerance=1.0) == [(100.0 + 100.0 + 100.4) / 3, 120.0]
+    # Sans regroupement, à nombre de touches égal le pivot le plus récent passe devant
+    assert builder.consolidate_levels(df, "Support", max_levels=3, tolerance=0.1) == [100.0, 120.0, 90.0]
+    # Tolérance par défaut : 0.5 ATR (ici 1 USDC de variation par bougie) -> 100 et 100.4 regroupés
+    assert builder.consolidate_levels(df, "Support", max_levels=1) == [(100.0 + 100.0 + 100.4) / 3]
+    assert builder.consolidate_levels(df, "Resistance") == []
+
+
+if __name__ == "__main__":
+    test_same_levels_as_shifted_comparisons()
+    test_consolidate_levels()
+    print("Niveaux de pivot : OK")
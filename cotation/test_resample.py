@@ -0,0 +1,60 @@
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import polars as pl
+
+from cotations import BinanceAPI, resample_ohlcv
+from store import KlineStore
+from test_store import FakeClient, HOUR_MS, NOW_MS
+
+
+class IntervalClient(FakeClient):
+    """Client simulé qui n'accepte que des bougies horaires."""
+
+    def get_historical_klines(self, symbol, interval, start_str, end_str=None, limit=500):
+        assert interval == '1h'
+        return super().get_historical_klines(symbol, interval, start_str, end_str, limit)
+
+    def get_klines(self, symbol, interval, startTime, limit=500):
+        assert interval == '1h'
+        return super().get_klines(symbol, interval, startTime, limit)
+
+
+def test_resample_ohlcv():
+    hours = [datetime(2024, 1, 4, 22), datetime(2024, 1, 5, 1), datetime(2024, 1, 5, 3), datetime(2024, 1, 8, 0)]
+    df = pl.DataFrame({
+        "Open Time": hours, "Open": [1.0, 2.0, 3.0, 4.0], "High": [5.0, 9.0, 6.0, 4.0],
+        "Low": [0.5, 1.0, 0.1, 4.0], "Close": [1.5, 2.5, 3.5, 4.5], "Volume": [1.0, 2.0, 3.0, 4.0],
+    }).with_columns(pl.col("Open Time").cast(pl.Datetime(time_unit="ms")))
+
+    df_4h = resample_ohlcv(df, '4h')
+    assert df_4h.get_column("Open Time").to_list() == [datetime(2024, 1, 4, 20), datetime(2024, 1, 5, 0), datetime(2024, 1, 8, 0)]
+    assert df_4h.row(1) == (datetime(2024, 1, 5, 0), 2.0, 9.0, 0.1, 3.5, 5.0)
+
+    # Bougies hebdomadaires ouvertes le lundi, comme sur Binance
+    df_1w = resample_ohlcv(df, '1w')
+    assert df_1w.get_column("Open Time").to_list() == [datetime(2024, 1, 1), datetime(2024, 1, 8)]
+    assert df_1w.row(0) == (datetime(2024, 1, 1), 1.0, 9.0, 0.1, 3.5, 6.0)
+
+
+def test_derived_intervals():
+    with tempfile.TemporaryDirectory() as tmp:
+        client = IntervalClient()
+        api = BinanceAPI(store=KlineStore(Path(tmp) / "klines.db"), client=client, base_interval='1h')
+        start_ms = NOW_MS - 30 * 24 * HOUR_MS + HOUR_MS  # début en milieu de bougie 4h
+
+        df = api.get_historical_data("BTCUSDC", '4h', start_ms)
+        assert df.get_column("Open Time").dt.epoch("ms").item(0) % (4 * HOUR_MS) == 0
+        assert df.get_column("Volume").head(-1).to_list() == [40.0] * (df.height - 1)  # bougies complètes
+        assert df is api.get_historical_data("BTCUSDC", '4h', start_ms)  # bougies de base inchangées : agrégat réutilisé
+
+        # Nouvelle valeur de la bougie en cours : l'agrégat est recalculé
+        client.last_close = 150.0
+        assert api.get_historical_data("BTCUSDC", '4h', start_ms).item(-1, "Close") == 150.0
+
+
+if __name__ == "__main__":
+    test_resample_ohlcv()
+    test_derived_intervals()
+    print("Agrégation des intervalles : OK")
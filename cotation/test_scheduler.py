@@ -1,20 +1,21 @@
-import schedule
-import time
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
 
 from appl import SiteWebLocal
 
 # --- Étape de Préparation ---
 
-def dummy_email_sender(symbol, recipient_email):
+def dummy_email_sender(recipients):
     """
-    Ceci est notre fonction "mannequin". Elle remplace la vraie fonction d'envoi d'email.
+    Ceci est notre fonction "mannequin". Elle remplace la vraie fonction d'envoi des lots d'emails.
     Elle ne fait qu'imprimer un message pour prouver qu'elle a été appelée.
     """
     print("-----------------------------------------------------")
     print(f"--- TÂCHE DÉCLENCHÉE à {datetime.now().strftime('%H:%M:%S')} ---")
-    print(f"    -> Appel simulé pour envoyer le rapport de '{symbol}' à '{recipient_email}'.")
+    for symbol, emails in recipients.items():
+        print(f"    -> Appel simulé pour envoyer le rapport de '{symbol}' à {emails}.")
     print("-----------------------------------------------------\n")
+    return []  # comme send_report_batch : aucun envoi en cours à attendre
 
 def run_scheduler_test():
     """
@@ -25,25 +26,26 @@ def run_scheduler_test():
     site = SiteWebLocal()
 
     # On remplace la vraie méthode par notre fonction mock
-    site.send_report_email = dummy_email_sender
+    site.send_report_batch = dummy_email_sender
 
-    # On vide les anciennes tâches et on charge la configuration depuis la BDD
-    schedule.clear()
+    # On charge la configuration depuis la BDD
     site.setup_schedules()
     
-    # On ajoute une tâche de test supplémentaire qui s'exécute très fréquemment
+    # On ajoute une tâche de test supplémentaire qui se reprogramme toutes les 15 secondes
     # pour ne pas avoir à attendre 7h du matin pour voir un résultat.
     print("INFO: Ajout d'une tâche de test rapide qui s'exécute toutes les 15 secondes.")
-    schedule.every(15).seconds.do(site.send_report_email, symbol="TEST-RAPIDE", recipient_email="test@local.com")
+    def quick_task():
+        site.send_report_email(symbol="TEST-RAPIDE", recipient_email="test@local.com")
+        site.scheduler.schedule("TEST-RAPIDE", datetime.now() + timedelta(seconds=15), quick_task)
+    site.scheduler.schedule("TEST-RAPIDE", datetime.now() + timedelta(seconds=15), quick_task)
 
     # 5. On lance la boucle de surveillance du scheduler pendant une durée limitée
     print("\n--- Démarrage de la boucle du scheduler pour 65 secondes ---")
     print("Surveillez les messages de 'TÂCHE DÉCLENCHÉE' ci-dessous...")
     
-    start_time = time.time()
-    while time.time() - start_time < 65:  # La boucle tournera pendant 65 secondes
-        schedule.run_pending()
-        time.sleep(1) # Le scheduler vérifie chaque seconde s'il y a quelque chose à faire
+    # La boucle du scheduler dort jusqu'à chaque échéance, elle est arrêtée au bout de 65 secondes
+    threading.Timer(65, site.scheduler.stop).start()
+    site.scheduler.run()
 
     print("\n--- Test terminé ---")
 
@@ -0,0 +1,13 @@
+from bench_startup import HEAVY_MODULES, measure_startup
+
+
+def test_startup_without_heavy_modules():
+    startup = measure_startup()
+    # Rendu, client Binance et téléchargement ne sont chargés qu'au premier usage : démarrage rapide et possible
+    # hors ligne. Aucune limite de durée (dépend de la machine) : seuls les modules chargés sont vérifiés.
+    assert startup['loaded'] == [], f"chargés au démarrage : {startup['loaded']} (surveillés : {HEAVY_MODULES})"
+
+
+if __name__ == "__main__":
+    test_startup_without_heavy_modules()
+    print("Démarrage rapide : OK")
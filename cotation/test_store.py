@@ -0,0 +1,68 @@
+import tempfile
+import time
+from pathlib import Path
+
+from cotations import BinanceAPI
+from store import KlineStore
+
+
+HOUR_MS = 3600 * 1000
+NOW_MS = int(time.time() * 1000) // HOUR_MS * HOUR_MS
+
+
+def make_kline(open_time, close=100.0):
+    """Bougie brute au format renvoyé par Binance (prix en chaînes de caractères)."""
+    return [open_time, str(close), str(close + 1), str(close - 1), str(close), "10.0",
+            open_time + HOUR_MS - 1, str(close * 10), 5, "4.0", str(close * 4), "0"]
+
+
+class FakeClient:
+    """Client Binance simulé : sert des bougies horaires jusqu'à NOW_MS et compte les appels."""
+
+    def __init__(self):
+        self.calls = []
+        self.last_close = 100.0
+
+    def _range(self, start_ms, end_ms):
+        first = -(-start_ms // HOUR_MS) * HOUR_MS
+        return [make_kline(t, self.last_close if t == NOW_MS else 100.0) for t in range(first, end_ms + 1, HOUR_MS)]
+
+    def get_historical_klines(self, symbol, interval, start_str, end_str=None, limit=500):
+        self.calls.append(("historical", start_str, end_str))
+        return self._range(start_str, end_str if end_str is not None else NOW_MS)
+
+    def get_klines(self, symbol, interval, startTime, limit=500):
+        self.calls.append(("klines", startTime, None))
+        return self._range(startTime, NOW_MS)[:limit]
+
+
+def test_incremental_fetch():
+    with tempfile.TemporaryDirectory() as tmp:
+        client = FakeClient()
+        api = BinanceAPI(store=KlineStore(str(Path(tmp) / "klines.db")), client=client)
+
+        # Premier appel : téléchargement complet de la fenêtre
+        df = api.get_historical_data("BTCUSDC", "1h", NOW_MS - 48 * HOUR_MS)
+        assert df.height == 49
+        assert client.calls == [("historical", NOW_MS - 48 * HOUR_MS, None)]
+
+        # Appel répété : une seule petite requête à partir de la dernière bougie stockée
+        client.calls.clear()
+        client.last_close = 123.0
+        df = api.get_historical_data("BTCUSDC", "1h", NOW_MS - 24 * HOUR_MS)
+        assert df.height == 25
+        assert client.calls == [("klines", NOW_MS, None)]
+        assert df.item(-1, "Close") == 123.0
+
+        # Fenêtre plus longue : seul le trou avant les données stockées est demandé
+        client.calls.clear()
+        df = api.get_historical_data("BTCUSDC", "1h", NOW_MS - 72 * HOUR_MS)
+        assert df.height == 73
+        assert client.calls[0] == ("historical", NOW_MS - 72 * HOUR_MS, NOW_MS - 48 * HOUR_MS - 1)
+        assert df.get_column("Open Time").is_sorted()
+        assert df.get_column("Open Time").n_unique() == 73
+
+
+if __name__ == "__main__":
+    test_incremental_fetch()
+    print("Stockage local des bougies : OK")
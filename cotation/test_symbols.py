@@ -0,0 +1,71 @@
+import json
+import math
+
+import polars as pl
+
+from analysis import TechnicalChartBuilder, CHART_COLUMNS
+from bench_historique import synthetic_ohlcv
+from info import PERIOD_SHORT, PERIOD_LONG, PERIOD_SUPPORT
+
+
+def test_batch_matches_single_symbol():
+    builder = TechnicalChartBuilder()
+    frames = {symbol: synthetic_ohlcv(n, 60).with_columns(pl.col("Close", "Low", "High") * (i + 1))
+              for i, (symbol, n) in enumerate({'BTCUSDC': 500, 'ETHUSDC': 300, 'SOLUSDC': 40}.items())}
+    # Format long, lignes volontairement mélangées
+    df_long = pl.concat([df.with_columns(symbol=pl.lit(symbol)) for symbol, df in frames.items()]).sample(fraction=1.0, shuffle=True, seed=0)
+
+    df_batch = builder.analyze_symbols(df_long).collect()
+    summary = builder.summarize_symbols(df_long)
+    assert summary.get_column("symbol").to_list() == sorted(frames)
+
+    for symbol, df in frames.items():
+        df_ma = builder.add_moving_averages(df, PERIOD_SHORT, PERIOD_LONG)
+        expected = builder.add_oscillators(builder.add_pivot_levels(df_ma, PERIOD_SUPPORT))
+        assert df_batch.filter(symbol=symbol).drop("symbol").equals(expected)
+        assert summary.filter(symbol=symbol).drop("symbol").row(0, named=True) == builder.add_summary_stats(expected)
+
+
+def test_analysis_plan():
+    builder = TechnicalChartBuilder()
+    df = synthetic_ohlcv(1_000, 60)
+    df_ma = builder.add_moving_averages(df, PERIOD_SHORT, PERIOD_LONG)
+    expected = builder.add_oscillators(builder.add_pivot_levels(df_ma, PERIOD_SUPPORT))
+
+    assert builder.analyze(df).equals(expected.select(CHART_COLUMNS))
+    # Filtre : seule la dernière bougie, sans calculer les autres indicateurs
+    assert builder.analyze(df, ["Close", "RSI_14"], last_only=True).equals(expected.select("Close", "RSI_14").tail(1))
+
+
+def reject_constant(constant):
+    """json.loads strict, comme le navigateur : NaN et Infinity ne sont pas du JSON."""
+    raise ValueError(f"{constant} dans le JSON")
+
+
+def test_chart_payload_round_trip():
+    builder = TechnicalChartBuilder()
+    df = builder.analyze(synthetic_ohlcv(300, 60))
+    stats = builder.add_summary_stats(df)
+    payload = json.loads(builder.build_chart_payload(df, stats), parse_constant=reject_constant)
+
+    assert list(payload) == ["x", "open", "high", "low", "close", "volume", "ma_short", "ma_long", "rsi", "macd",
+                             "macd_signal", "macd_hist", "supports", "resistances", "summary_stats"]
+    assert payload["close"] == df.get_column("Close").to_list() and len(payload["x"]) == 300
+    # NaN du début des indicateurs -> null
+    assert payload["rsi"][0] is None and all(v is None or not math.isnan(v) for v in payload["rsi"])
+    assert payload["supports"] == builder.consolidate_levels(df, "Support") and payload["summary_stats"] == stats
+    # Prix plats : RSI indéfini (NaN) jusque dans les statistiques -> null
+    flat = builder.analyze(synthetic_ohlcv(300, 60).with_columns(pl.lit(100.0).alias(name) for name in ("Open", "High", "Low", "Close")))
+    flat_stats = builder.add_summary_stats(flat)
+    assert math.isnan(flat_stats["rsi"])
+    payload = json.loads(builder.build_chart_payload(flat, flat_stats), parse_constant=reject_constant)
+    assert payload["summary_stats"]["rsi"] is None and payload["summary_stats"]["close"] == 100.0
+    # Aucune bougie : listes vides, toujours un objet JSON valide
+    assert json.loads(builder.build_chart_payload(df.clear(), {}))["close"] == []
+
+
+if __name__ == "__main__":
+    test_batch_matches_single_symbol()
+    test_analysis_plan()
+    test_chart_payload_round_trip()
+    print("Analyse multi-cryptos : OK")
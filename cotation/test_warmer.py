@@ -0,0 +1,69 @@
+import contextlib
+import gzip
+import json
+import tempfile
+import threading
+from datetime import datetime, timezone
+
+from appl import SiteWebLocal
+from warmer import SnapshotWarmer, next_warm_time
+
+
+def test_next_warm_time():
+    # 2024-05-15 13:37:20 UTC : bougie 5m close à 13:40, bougie 1h à 14:00
+    now = datetime(2024, 5, 15, 13, 37, 20, tzinfo=timezone.utc).timestamp()
+    assert next_warm_time('5m', now, delay=5).timestamp() == datetime(2024, 5, 15, 13, 40, 5, tzinfo=timezone.utc).timestamp()
+    assert next_warm_time('1h', now, delay=5).timestamp() == datetime(2024, 5, 15, 14, 0, 5, tzinfo=timezone.utc).timestamp()
+
+
+def test_warmer_refreshes_every_view():
+    warmed = []
+    done = threading.Event()
+
+    def warm(symbol, profondeur):
+        warmed.append((symbol, profondeur))
+        if len(warmed) == 3:
+            done.set()
+
+    views = {('BTCUSDC', '1j'): '5m', ('BTCUSDC', '1s'): '1h', ('ETHUSDC', '1j'): '5m'}
+    warmer = SnapshotWarmer(warm, views)
+    warmer.start()
+    assert done.wait(2)
+    warmer.stop()
+    warmer.thread.join(1)
+    assert sorted(warmed) == sorted(views)
+    # Chaque vue est reprogrammée à la clôture de sa propre bougie
+    scheduled = warmer.scheduler.scheduled()
+    assert scheduled[('BTCUSDC', '1j')] == next_warm_time('5m') and scheduled[('BTCUSDC', '1s')] == next_warm_time('1h')
+
+
+def test_gzip_snapshot_and_etag():
+    with tempfile.TemporaryDirectory() as tmp, contextlib.chdir(tmp):
+        site = SiteWebLocal()
+        calls = []
+        site.build_historique = lambda symbol, profondeur: calls.append(1) or json.dumps({'symbol': symbol}).encode()
+
+        # Vue préchauffée : la requête n'est plus qu'une lecture du cache
+        site.historique_snapshot('BTCUSDC', '1s')
+        client = site.app.test_client()
+        response = client.get('/api/historique?crypto=BTCUSDC&profondeur=1s', headers={'Accept-Encoding': 'gzip'})
+        assert len(calls) == 1
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert json.loads(gzip.decompress(response.data)) == {'symbol': 'BTCUSDC'}
+
+        # Revalidation avec l'ETag : 304 sans corps
+        etag = response.headers['ETag']
+        response = client.get('/api/historique?crypto=BTCUSDC&profondeur=1s', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert response.status_code == 304 and response.data == b''
+
+        # Client sans gzip : contenu décompressé, ETag distinct
+        response = client.get('/api/historique?crypto=BTCUSDC&profondeur=1s', headers={'Accept-Encoding': 'identity'})
+        assert 'Content-Encoding' not in response.headers and response.json == {'symbol': 'BTCUSDC'}
+        assert response.headers['ETag'] != etag and len(calls) == 1
+
+
+if __name__ == "__main__":
+    test_next_warm_time()
+    test_warmer_refreshes_every_view()
+    test_gzip_snapshot_and_etag()
+    print("Préchauffage du dashboard : OK")
@@ -0,0 +1,30 @@
+import threading
+import time
+
+from workers import ReportPool
+
+
+def test_stage_concurrency_cap():
+    pool = ReportPool({'send': 2, 'render': 1})
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def slow_send():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.1)
+        with lock:
+            running[0] -= 1
+
+    futures = [pool.submit('send', f"email {i}", slow_send) for i in range(6)]
+    for f in futures: f.result()
+    assert peak[0] == 2
+
+    # L'étape de rendu tourne dans un processus séparé
+    assert pool.run('render', "rendu", pow, 2, 10) == 1024
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    test_stage_concurrency_cap()
+    print("Pool de rapports : OK")
@@ -0,0 +1,116 @@
+import contextlib
+import os
+import queue
+import sqlite3
+import threading
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+from analysis import TechnicalChartBuilder
+from appl import SiteWebLocal
+from live import LiveMarket, ReplayKlineFeed
+from test_live import FakeBinanceAPI, HOUR_MS, START_MS, make_kline
+
+
+def test_scheduler_leader_and_sync():
+    # Deux workers sur les mêmes bases, dans un répertoire de travail vide
+    with tempfile.TemporaryDirectory() as tmp, contextlib.chdir(tmp):
+        worker_a, worker_b = SiteWebLocal(shared_cache=True), SiteWebLocal(shared_cache=True)
+        leaders = []
+        for name, site in (('a', worker_a), ('b', worker_b)):
+            site.setup_schedules = lambda name=name: leaders.append(name)
+            site.run_pending_tasks = lambda: time.sleep(3600)
+            site.follow_schedules = lambda: None
+            site.snapshot_warmer.start = lambda: None
+            site.start_scheduler_leader(os.path.join(tmp, "scheduler.lock"))
+        time.sleep(0.3)
+        # Un seul worker obtient le verrou et fait tourner le scheduler
+        assert len(leaders) == 1
+
+        # Tâche ajoutée par un worker, reprise par l'autre à la synchronisation
+        next_run = worker_b.db.add_schedule("BTCUSDC", "test@local.com", "daily", "job_b")
+        worker_a.sync_schedules()
+        assert worker_a.scheduler.scheduled() == {"job_b": next_run}
+        worker_b.db.mark_done(["job_b"], next_run + timedelta(minutes=1))
+        worker_b.db.add_schedule("ETHUSDC", "test@local.com", "weekly", "job_c")
+        worker_b.db.remove_schedule("job_b")
+        worker_a.sync_schedules()
+        assert list(worker_a.scheduler.scheduled()) == ["job_c"]
+        assert worker_a.scheduler.next_run_at() > datetime.now()
+
+
+def test_failed_batch_keeps_jobs():
+    with tempfile.TemporaryDirectory() as tmp, contextlib.chdir(tmp):
+        site = SiteWebLocal()
+        site.db.add_schedule("BTCUSDC", "test@local.com", "daily", "job_a")
+        # Tâche manquée pendant un arrêt : due immédiatement
+        with site.db.transaction() as cursor:
+            cursor.execute("UPDATE schedules SET next_run_at = '2020-01-01 07:00:00'")
+        site.setup_schedules()
+
+        def locked(*args):
+            raise sqlite3.OperationalError("database is locked")
+
+        # Lot en échec (BDD verrouillée) : la tâche reste programmée, retentée une minute plus tard
+        with mock.patch.object(site.db, "get_due_schedules", locked):
+            site.run_due_reports()
+            assert site.scheduler.scheduled()["job_a"] > datetime.now() + timedelta(seconds=50)
+
+            # BDD inaccessible même pour la reprogrammation : nouvel essai programmé
+            with mock.patch.object(site.db, "get_next_runs", locked):
+                site.run_due_reports()
+                assert "retry" in site.scheduler.scheduled()
+
+
+def test_stream_cap():
+    with tempfile.TemporaryDirectory() as tmp, contextlib.chdir(tmp):
+        site = SiteWebLocal()
+        site.stream_slots = threading.BoundedSemaphore(2)
+        site.live_market.listen = lambda symbol, interval, days: ("stream", queue.Queue())
+        site.live_market.events = lambda symbol, interval, stream, listener: iter(["data: {}\n\n"] * 1000)
+        site.live_market.unlisten = lambda symbol, interval, stream, listener: None
+        client = site.app.test_client()
+
+        # Deux flux ouverts : le troisième est refusé sans occuper de thread
+        streams = [client.get('/api/stream?crypto=BTCUSDC', buffered=False) for _ in range(2)]
+        assert [r.status_code for r in streams] == [200, 200]
+        refused = client.get('/api/stream?crypto=BTCUSDC')
+        assert refused.status_code == 503 and refused.headers['Retry-After'] == '30'
+        # Page fermée : sa place est libérée
+        streams[0].close()
+        assert client.get('/api/stream?crypto=BTCUSDC', buffered=False).status_code == 200
+        # Historique indisponible : la place n'est pas gardée
+        site.live_market.listen = lambda symbol, interval, days: None
+        streams[1].close()
+        assert client.get('/api/stream?crypto=BTCUSDC').status_code == 200
+        assert site.stream_slots.acquire(blocking=False)
+
+
+
+def test_stream_closed_before_first_event():
+    with tempfile.TemporaryDirectory() as tmp, contextlib.chdir(tmp):
+        site = SiteWebLocal()
+        feed = ReplayKlineFeed([make_kline(START_MS + 59 * HOUR_MS, 170.0)])
+        site.live_market = market = LiveMarket(feed, FakeBinanceAPI(), TechnicalChartBuilder())
+        site.stream_slots = threading.BoundedSemaphore(1)
+        client = site.app.test_client()
+
+        # Requête HEAD (réponse sans corps : le générateur ne démarre jamais), puis client déconnecté après le premier
+        # événement
+        for method in ('HEAD', 'GET'):
+            response = client.open('/api/stream?crypto=BTCUSDC', method=method, buffered=False)
+            assert response.status_code == 200 and len(market.streams) == 1
+            response.close()  # fermeture de la réponse par le serveur WSGI
+            assert not market.streams and not feed.stops
+        # Place libérée
+        assert site.stream_slots.acquire(blocking=False)
+
+
+if __name__ == "__main__":
+    test_scheduler_leader_and_sync()
+    test_failed_batch_keeps_jobs()
+    test_stream_cap()
+    test_stream_closed_before_first_event()
+    print("Mode multi-workers : OK")
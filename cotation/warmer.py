@@ -0,0 +1,55 @@
+import threading
+import time
+from datetime import datetime
+
+from cache import candle_open_time
+from scheduler import TaskScheduler
+from info import WARMER_DELAY
+
+
+def next_warm_time(interval, now=None, delay=WARMER_DELAY) -> datetime:
+    """Heure du prochain préchauffage d'une vue : 'delay' secondes après la clôture de la bougie en cours."""
+    from binance.helpers import interval_to_milliseconds
+
+    now = time.time() if now is None else now
+    return datetime.fromtimestamp(candle_open_time(interval, now) + interval_to_milliseconds(interval) // 1000 + delay)
+
+
+class SnapshotWarmer:
+    """
+    Préchauffage en tâche de fond des réponses du dashboard : chaque vue (symbol, profondeur) est recalculée
+    peu après la clôture de chacune de ses bougies, à son propre rythme (5 minutes pour '1j', 1 heure pour '1s'...).
+    Le premier visiteur après une clôture trouve ainsi la réponse déjà en cache.
+    warm(symbol, profondeur) calcule et met en cache la réponse d'une vue.
+    """
+
+    def __init__(self, warm, views: dict[tuple[str, str], str], delay=WARMER_DELAY):
+        self.warm = warm
+        self.views = views  # (symbol, profondeur) -> intervalle des bougies
+        self.delay = delay
+        self.scheduler = TaskScheduler()
+        self.thread = None
+
+    def start(self) -> None:
+        """Préchauffe toutes les vues puis les recalcule à chaque clôture (sans effet si déjà lancé)."""
+        if self.thread is not None:
+            return
+        now = datetime.now()
+        for view in self.views:
+            self.scheduler.schedule(view, now, lambda view=view: self.refresh(view))
+        self.thread = threading.Thread(target=self.scheduler.run, daemon=True, name="snapshot-warmer")
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.scheduler.stop()
+
+    def refresh(self, view) -> None:
+        """Recalcule une vue puis la reprogramme après la clôture de sa bougie suivante."""
+        started_at = time.perf_counter()
+        try:
+            self.warm(*view)
+            print(f"Préchauffage {view[0]} {view[1]} : {time.perf_counter() - started_at:.2f}s")
+        except Exception as e:
+            print(f"Préchauffage {view[0]} {view[1]} impossible : {e}")
+        finally:
+            self.scheduler.schedule(view, next_warm_time(self.views[view], delay=self.delay), lambda: self.refresh(view))
@@ -0,0 +1,77 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from info import REPORT_WORKERS
+
+
+def _timed_call(fn, args, kwargs, enqueued_at):
+    """Exécute fn en relevant l'heure de début et de fin (fonction de module : transmissible aux processus)."""
+    started_at = time.time()
+    result = fn(*args, **kwargs)
+    return result, started_at, time.time()
+
+
+class ReportPool:
+    """
+    Pool d'exécution des rapports, découpé en étapes dont la concurrence est plafonnée séparément :
+    threads pour les E/S (téléchargement, SMTP), processus pour le rendu des graphiques (CPU).
+    """
+    PROCESS_STAGES = ('render',)
+
+    def __init__(self, workers=None):
+        workers = workers or REPORT_WORKERS
+        self.executors = {}
+        for stage, count in workers.items():
+            if stage in self.PROCESS_STAGES:
+                # 'spawn' : pas de fork d'un processus qui contient déjà les threads Flask et scheduler
+                self.executors[stage] = ProcessPoolExecutor(max_workers=count, mp_context=multiprocessing.get_context('spawn'))
+            else:
+                self.executors[stage] = ThreadPoolExecutor(max_workers=count, thread_name_prefix=f"report-{stage}")
+
+    def submit(self, stage, label, fn, *args, **kwargs) -> Future:
+        """Soumet une tâche à une étape et affiche son temps d'attente et d'exécution une fois terminée."""
+        enqueued_at = time.time()
+        inner = self.executors[stage].submit(_timed_call, fn, args, kwargs, enqueued_at)
+        outer = Future()
+
+        def done(f):
+            try:
+                result, started_at, finished_at = f.result()
+            except Exception as e:
+                print(f"[{stage}] {label} : échec après {time.time() - enqueued_at:.2f}s ({e})")
+                outer.set_exception(e)
+                return
+            print(f"[{stage}] {label} : attente {started_at - enqueued_at:.2f}s, exécution {finished_at - started_at:.2f}s")
+            outer.set_result(result)
+
+        inner.add_done_callback(done)
+        return outer
+
+    def run(self, stage, label, fn, *args, **kwargs):
+        """Soumet une tâche et attend son résultat."""
+        return self.submit(stage, label, fn, *args, **kwargs).result()
+
+    def shutdown(self, wait=True) -> None:
+        """Arrête toutes les étapes du pool."""
+        for executor in self.executors.values():
+            executor.shutdown(wait=wait)
+
+
+def when_all(futures, callback) -> None:
+    """Appelle callback() une seule fois, quand toutes les futures sont terminées."""
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            callback()
+
+    if not futures:
+        callback()
+    for future in futures:
+        future.add_done_callback(done)
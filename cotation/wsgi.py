@@ -0,0 +1,10 @@
+from appl import SiteWebLocal
+
+# Point d'entrée du mode production, un SiteWebLocal par processus worker :
+#   gunicorn -c gunicorn.conf.py wsgi:app
+# Les bougies (klines.db), les tâches (scheduler.db) et le cache des réponses (cache.db) sont partagés
+# par les workers ; le scheduler ne tourne que dans le worker qui détient le verrou SCHEDULER_LOCK_PATH.
+
+site = SiteWebLocal(shared_cache=True)
+site.start_scheduler_leader()
+app = site.app